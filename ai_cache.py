@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+AI 结果缓存
+
+相同输入（模型、提示词版本、词、词频档位、样本）的锐评和选词结果保存在本地 SQLite，
+重复生成报告时直接复用，不再请求模型；按有效期和条数淘汰，命中/未命中次数可供监控读取
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+import contextlib
+import config as cfg
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'runtime_outputs', 'ai_cache.sqlite3')
+
+
+def freq_bucket(freq):
+    """词频档位（按 2 的幂分档），词频小幅变化时仍能命中缓存"""
+    try:
+        return int(math.log2(max(int(freq), 1)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def samples_digest(samples):
+    """样本列表的哈希"""
+    raw = json.dumps(list(samples), ensure_ascii=False)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def make_key(*parts):
+    """由若干部分拼出缓存键"""
+    raw = json.dumps(parts, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class AICache:
+    def __init__(self, path, ttl_days=30, max_entries=20000):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ai_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache (last_used)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """打开连接并在一个事务中执行，结束后关闭连接"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """读取缓存值（JSON 反序列化后返回），未命中或已过期返回 None"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl:
+                conn.execute("UPDATE ai_cache SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return json.loads(row[0])
+            if row:
+                conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def set(self, key, value, kind=''):
+        """写入缓存，超过条数上限时淘汰最久未使用的条目"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, kind, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self.writes += 1
+            # 每写入一定次数做一次淘汰，避免每次写入都扫描
+            if self.writes % 100 == 1:
+                self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM ai_cache WHERE created_at < ?", (now - self.ttl,))
+        count = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM ai_cache WHERE key IN "
+                "(SELECT key FROM ai_cache ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+            'entries': entries,
+            'max_entries': self.max_entries,
+        }
+
+
+_cache = None
+_cache_failed = False
+_cache_lock = threading.Lock()
+
+
+def get_ai_cache():
+    """进程内共享的 AI 缓存实例；AI_CACHE_ENABLED = False 或初始化失败时返回 None"""
+    global _cache, _cache_failed
+    if not getattr(cfg, 'AI_CACHE_ENABLED', True):
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_failed:
+            try:
+                _cache = AICache(
+                    getattr(cfg, 'AI_CACHE_PATH', '') or DEFAULT_CACHE_PATH,
+                    ttl_days=getattr(cfg, 'AI_CACHE_TTL_DAYS', 30),
+                    max_entries=getattr(cfg, 'AI_CACHE_MAX_ENTRIES', 20000),
+                )
+            except Exception as e:
+                print(f"⚠️ AI缓存初始化失败: {e}")
+                _cache_failed = True
+        return _cache
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+进程内共享的 OpenAI 客户端
+
+AIWordSelector、AICommentGenerator 共用同一个 OpenAI 客户端及其 httpx 连接池，
+连接保持 keep-alive，多次生成报告时不再重复建立 TLS 连接；首次使用时才创建
+"""
+
+import os
+import threading
+import config as cfg
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_api_settings():
+    """读取 API 配置（环境变量优先），返回 (api_key, base_url, model)"""
+    api_key = os.getenv('OPENAI_API_KEY', cfg.OPENAI_API_KEY)
+    base_url = os.getenv('OPENAI_BASE_URL', cfg.OPENAI_BASE_URL)
+    model = os.getenv('OPENAI_MODEL', cfg.OPENAI_MODEL)
+    return api_key, base_url, model
+
+
+def is_api_key_configured(api_key):
+    return bool(api_key) and api_key != "sk-your-api-key-here"
+
+
+def _build_client(api_key, base_url):
+    from openai import OpenAI
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=getattr(cfg, 'AI_HTTP_MAX_CONNECTIONS', 20),
+        max_keepalive_connections=getattr(cfg, 'AI_HTTP_MAX_KEEPALIVE', 10),
+        keepalive_expiry=getattr(cfg, 'AI_HTTP_KEEPALIVE_EXPIRY', 60),
+    )
+    timeout = httpx.Timeout(
+        getattr(cfg, 'AI_HTTP_TIMEOUT', 120),
+        connect=getattr(cfg, 'AI_HTTP_CONNECT_TIMEOUT', 10),
+    )
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url or None,
+        http_client=httpx.Client(limits=limits, timeout=timeout),
+        max_retries=0  # 重试由调用方控制
+    )
+
+
+def get_openai_client():
+    """
+    返回共享的 OpenAI 客户端；未配置 API Key 时返回 None，初始化失败时抛出异常
+    按 (api_key, base_url) 区分，配置变化后会创建新的客户端
+    """
+    api_key, base_url, _ = get_api_settings()
+    if not is_api_key_configured(api_key):
+        return None
+
+    key = (api_key, base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _build_client(api_key, base_url)
+            _clients[key] = client
+            if os.environ.get('HTTPS_PROXY') or os.environ.get('https_proxy'):
+                print("🌐 系统代理已自动加载")
+        return client
+
+
+def close_clients():
+    """关闭所有共享客户端及其连接池"""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
@@ -1,31 +1,91 @@
 # -*- coding: utf-8 -*-
 import re
-import random
-import string
-import math
+import json
+import hashlib
 import jieba
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, namedtuple
 import config as cfg
 from utils import (
     extract_emojis,
-    is_emoji,
     parse_timestamp,
     clean_text,
-    calculate_entropy,
     analyze_single_chars,
 )
+from segmenter import (
+    SegmentationCache,
+    ReservoirSampler,
+    sample_salt,
+    iter_count_tokens,
+    count_tokens_parallel,
+)
+from word_discovery import discover_new_words
+from word_filter import WordFilter
+from rankings import top_items, compute_rankings
 
 jieba.setLogLevel(jieba.logging.INFO)
 
+# 消息记录标志位
+FLAG_HAS_TEXT = 1
+FLAG_IMAGE = 2
+FLAG_FORWARD = 4
+FLAG_REPLY = 8
+FLAG_LINK = 16
+
+# analyze() 的各个阶段 (key, 说明)，供进度回调使用
+ANALYSIS_STAGES = [
+    ('preprocess', '预处理文本'),
+    ('single_chars', '分析单字独立性'),
+    ('discover', '新词发现'),
+    ('merge', '词组合并'),
+    ('tokenize', '分词统计'),
+    ('fun_stats', '趣味统计'),
+    ('filter', '过滤整理'),
+]
+
+# 影响分析结果的配置项，用于计算结果缓存的配置指纹
+ANALYSIS_CONFIG_KEYS = [
+    'TOP_N', 'MIN_FREQ', 'MIN_WORD_LEN', 'MAX_WORD_LEN',
+    'PMI_THRESHOLD', 'ENTROPY_THRESHOLD', 'NEW_WORD_MIN_FREQ',
+    'MERGE_MIN_FREQ', 'MERGE_MIN_PROB', 'MERGE_MAX_LEN',
+    'SINGLE_MIN_SOLO_RATIO', 'SINGLE_MIN_SOLO_COUNT',
+    'WHITELIST', 'BLACKLIST', 'STOPWORDS',
+    'RANK_TOP_N', 'CONTRIBUTOR_TOP_N', 'SAMPLE_COUNT', 'SAMPLE_SEED',
+    'NIGHT_OWL_HOURS', 'EARLY_BIRD_HOURS', 'FILTER_BOT_MESSAGES',
+]
+
+# 分析结果格式版本，分析逻辑或 export_json 结构变化时递增，使旧缓存失效
+ANALYSIS_VERSION = 1
+
+
+def config_fingerprint(config=cfg):
+    """分析相关配置的指纹，任一配置项变化都会得到不同的值"""
+    values = {'_version': ANALYSIS_VERSION, '_jieba': jieba.__version__}
+    for key in ANALYSIS_CONFIG_KEYS:
+        value = getattr(config, key, None)
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        elif isinstance(value, range):
+            value = list(value)
+        values[key] = value
+    raw = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+# 单遍读取后的紧凑消息记录，text 为清理后的文本，hour 为东八区小时（解析失败为 None）
+MessageRecord = namedtuple('MessageRecord', [
+    'uin', 'text', 'hour', 'flags', 'reply_to', 'at_uids', 'emojis', 'sticker_count',
+])
+
 class ChatAnalyzer:
     def __init__(self, data):
         self.data = data
+        # messages 可以是列表，也可以是 utils.MessageStream 这类可重复迭代的流
         self.messages = data.get('messages', [])
-        self.chat_name = data.get('chatName', data.get('chatInfo', {}).get('name', '未知群聊'))
+        self.message_count = 0
         self.uin_to_name = {}
         self.msgid_to_sender = {}
         self.word_freq = Counter()
-        self.word_samples = defaultdict(list)
+        self.word_sample_ids = defaultdict(list)  # 热词样本：cleaned_texts 下标
         self.word_contributors = defaultdict(Counter)
         self.user_msg_count = Counter()
         self.user_char_count = Counter()
@@ -45,8 +105,16 @@ class ChatAnalyzer:
         self.discovered_words = set()
         self.merged_words = {}
         self.single_char_stats = {}  # 单字统计
+        self.word_filter = None
         self.cleaned_texts = []  # 缓存清洗后的文本
-        self._build_mappings()
+        self.records = []  # 归一化后的消息记录（MessageRecord）
+        self.skipped_text_count = 0
+        self.bot_filtered_count = 0
+        self._reset_rankings_cache()
+        self._ingest_messages()
+        # 流式读取时 messages 之后的顶层字段在遍历消息后才可用
+        self.chat_name = data.get('chatName', data.get('chatInfo', {}).get('name', '未知群聊'))
+        self.segment_cache = SegmentationCache(self.cleaned_texts)
 
     def _is_bot_message(self, msg):
         """判断是否为机器人消息（基于 subMsgType）"""
@@ -57,21 +125,27 @@ class ChatAnalyzer:
         sub_msg_type = raw_msg.get('subMsgType', 0)
         return sub_msg_type in [577, 65]
 
-    def _build_mappings(self):
-        """构建 uin 到 name 的映射，优先保留有效的 name"""
+    def _ingest_messages(self):
+        """
+        单遍读取所有消息：构建 uin/name 映射，并把每条消息归一化为 MessageRecord
+        后续所有阶段只消费 self.records，每条消息只解析、清洗一次
+        """
         # 先收集每个 uin 的所有 name（按顺序）和 sendMemberName
         uin_names = defaultdict(list)
         uin_member_names = {}  # 存储最后的 sendMemberName
         
         for msg in self.messages:
+            self.message_count += 1
             # 跳过机器人消息
             if self._is_bot_message(msg):
+                self.bot_filtered_count += 1
                 continue
             
             sender = msg.get('sender', {})
             uin = sender.get('uin')
             name = sender.get('name', '').strip()  # 去除首尾空白
             msg_id = msg.get('messageId')
+            raw_msg = msg.get('rawMessage', {})
             
             # 收集 name
             if uin and name:
@@ -81,14 +155,77 @@ class ChatAnalyzer:
             
             # 收集 sendMemberName（保留最后一个）
             if uin:
-                raw_msg = msg.get('rawMessage', {})
                 send_member_name = raw_msg.get('sendMemberName', '').strip()
                 if send_member_name:
                     uin_member_names[uin] = send_member_name
             
             if msg_id and uin:
                 self.msgid_to_sender[msg_id] = uin
+            
+            record = self._make_record(msg, uin, raw_msg)
+            if record.text:
+                self.cleaned_texts.append(record.text)
+            elif record.flags & FLAG_HAS_TEXT:
+                self.skipped_text_count += 1
+            
+            # 无发送者且无有效文本的消息不参与任何统计
+            if uin or record.text:
+                self.records.append(record)
         
+        self._build_mappings(uin_names, uin_member_names)
+
+    def _make_record(self, msg, uin, raw_msg):
+        """把一条原始消息归一化为 MessageRecord"""
+        content = msg.get('content', {})
+        is_dict = isinstance(content, dict)
+        text = content.get('text', '') if is_dict else ''
+        clean = clean_text(text)
+        
+        flags = FLAG_HAS_TEXT if text else 0
+        # 图片检测（排除gif）
+        if '[图片:' in text and '.gif' not in text.lower():
+            flags |= FLAG_IMAGE
+        # 转发检测
+        if '[合并转发:' in text:
+            flags |= FLAG_FORWARD
+        # 链接检测
+        if '[链接:' in text or re.search(r'https?://', text):
+            flags |= FLAG_LINK
+        
+        # 回复目标（发送者在全部消息读取完后再解析）
+        reply_to = None
+        reply_info = content.get('reply') if is_dict else None
+        if reply_info:
+            flags |= FLAG_REPLY
+            reply_to = reply_info.get('referencedMessageId') or None
+        
+        # @目标
+        at_uids = []
+        for elem in raw_msg.get('elements', []):
+            if elem.get('elementType') == 1:
+                text_elem = elem.get('textElement', {})
+                at_type = text_elem.get('atType', 0)
+                at_uid = text_elem.get('atUid', '')
+                if at_type > 0 and at_uid and at_uid != '0':
+                    at_uids.append(at_uid)
+        
+        # 表情（emoji 来自清理后文本，[表情:] 和 gif 来自原文）
+        emojis = tuple(extract_emojis(clean)) if clean else ()
+        sticker_count = text.count('[表情:') + text.lower().count('.gif')
+        
+        return MessageRecord(
+            uin=uin,
+            text=clean,
+            hour=parse_timestamp(msg.get('timestamp', '')),
+            flags=flags,
+            reply_to=reply_to,
+            at_uids=tuple(at_uids),
+            emojis=emojis,
+            sticker_count=sticker_count,
+        )
+
+    def _build_mappings(self, uin_names, uin_member_names):
+        """构建 uin 到 name 的映射，优先保留有效的 name"""
         # 为每个 uin 选择最合适的 name
         for uin, names in uin_names.items():
             # 从后往前找第一个不等于uin的 name
@@ -111,52 +248,55 @@ class ChatAnalyzer:
     def get_name(self, uin):
         return self.uin_to_name.get(uin, f"未知用户({uin})")
 
-    def analyze(self):
+    def analyze(self, progress=None):
+        """
+        执行完整分析
+        progress: 可选回调 progress(stage, label, current, total)，每个阶段开始前调用
+        """
+        def stage(index):
+            if progress:
+                key, label = ANALYSIS_STAGES[index]
+                progress(key, label, index + 1, len(ANALYSIS_STAGES))
+        
         print(f"📊 开始分析: {self.chat_name}")
-        print(f"📝 消息数: {len(self.messages)}")
+        print(f"📝 消息数: {self.message_count}")
         print("=" * cfg.CONSOLE_WIDTH)
         
+        stage(0)
         print("\n🧹 预处理文本...")
         self._preprocess_texts()
         
+        stage(1)
         print("🔤 分析单字独立性...")
         self.single_char_stats = analyze_single_chars(self.cleaned_texts)
         
+        stage(2)
         print("🔍 新词发现...")
         self._discover_new_words()
         
+        stage(3)
         print("🔗 词组合并...")
         self._merge_word_pairs()
         
+        stage(4)
         print("📈 分词统计...")
         self._tokenize_and_count()
         
+        stage(5)
         print("🎮 趣味统计...")
         self._fun_statistics()
         
+        stage(6)
         print("🧹 过滤整理...")
         self._filter_results()
+        self._reset_rankings_cache()
         
         print("\n✅ 完成!")
 
     def _preprocess_texts(self):
-        """预处理所有文本"""
-        skipped = 0
-        bot_filtered = 0
-        for msg in self.messages:
-            # 跳过机器人消息
-            if self._is_bot_message(msg):
-                bot_filtered += 1
-                continue
-            
-            content = msg.get('content', {})
-            text = content.get('text', '') if isinstance(content, dict) else ''
-            cleaned = clean_text(text)
-            if cleaned and len(cleaned) >= 1:
-                self.cleaned_texts.append(cleaned)
-            elif text:
-                skipped += 1
-        
+        """预处理所有文本（清洗已在读取消息时完成，这里只汇总）"""
+        skipped = self.skipped_text_count
+        bot_filtered = self.bot_filtered_count
         if cfg.FILTER_BOT_MESSAGES and bot_filtered > 0:
             print(f"   有效文本: {len(self.cleaned_texts)} 条, 跳过: {skipped} 条, 过滤机器人: {bot_filtered} 条")
         else:
@@ -164,64 +304,13 @@ class ChatAnalyzer:
 
     def _discover_new_words(self):
         """新词发现"""
-        ngram_freq = Counter()
-        left_neighbors = defaultdict(Counter)
-        right_neighbors = defaultdict(Counter)
-        total_chars = 0
-        
-        for text in self.cleaned_texts:
-            # 按标点分句
-            sentences = re.split(r'[，。！？、；：""''（）\s\n\r,\.!?\(\)]', text)
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if len(sentence) < 2:
-                    continue
-                total_chars += len(sentence)
-                
-                for n in range(2, min(6, len(sentence) + 1)):
-                    for i in range(len(sentence) - n + 1):
-                        ngram = sentence[i:i+n]
-                        # 跳过纯数字/符号/纯英文
-                        if re.match(r'^[\d\s\W]+$', ngram) or re.match(r'^[a-zA-Z]+$', ngram):
-                            continue
-                        ngram_freq[ngram] += 1
-                        if i > 0:
-                            left_neighbors[ngram][sentence[i-1]] += 1
-                        else:
-                            left_neighbors[ngram]['<BOS>'] += 1
-                        if i + n < len(sentence):
-                            right_neighbors[ngram][sentence[i+n]] += 1
-                        else:
-                            right_neighbors[ngram]['<EOS>'] += 1
-        
-        # 筛选新词
-        for word, freq in ngram_freq.items():
-            if freq < cfg.NEW_WORD_MIN_FREQ:
-                continue
-            
-            # 邻接熵
-            left_ent = calculate_entropy(left_neighbors[word])
-            right_ent = calculate_entropy(right_neighbors[word])
-            min_ent = min(left_ent, right_ent)
-            if min_ent < cfg.ENTROPY_THRESHOLD:
-                continue
-            
-            # PMI（内部凝聚度）
-            min_pmi = float('inf')
-            for i in range(1, len(word)):
-                left_freq = ngram_freq.get(word[:i], 0)
-                right_freq = ngram_freq.get(word[i:], 0)
-                if left_freq > 0 and right_freq > 0:
-                    pmi = math.log2((freq * total_chars) / (left_freq * right_freq + 1e-10))
-                    min_pmi = min(min_pmi, pmi)
-            
-            if min_pmi == float('inf'):
-                min_pmi = 0
-            
-            if min_pmi < cfg.PMI_THRESHOLD:
-                continue
-            
-            self.discovered_words.add(word)
+        self.discovered_words = discover_new_words(
+            self.cleaned_texts,
+            min_freq=cfg.NEW_WORD_MIN_FREQ,
+            entropy_threshold=cfg.ENTROPY_THRESHOLD,
+            pmi_threshold=cfg.PMI_THRESHOLD,
+            backend=getattr(cfg, 'NEW_WORD_BACKEND', 'auto'),
+        )
         
         # 添加到jieba词典
         for word in self.discovered_words:
@@ -234,8 +323,8 @@ class ChatAnalyzer:
         bigram_counter = Counter()
         word_right_counter = Counter()
         
-        for text in self.cleaned_texts:
-            words = [w for w in jieba.cut(text) if w.strip()]
+        for idx in range(len(self.cleaned_texts)):
+            words = [w for w in self.segment_cache.cut(idx) if w.strip()]
             for i in range(len(words) - 1):
                 w1, w2 = words[i].strip(), words[i+1].strip()
                 if not w1 or not w2:
@@ -246,6 +335,8 @@ class ChatAnalyzer:
                 word_right_counter[w1] += 1
         
         # 找出应该合并的词对
+        # 合并词组不计入词典总频次：总频次不变时只有包含合并词组的文本切分结果会变化
+        dict_total = jieba.dt.total
         for (w1, w2), count in bigram_counter.items():
             merged = w1 + w2
             if len(merged) > cfg.MERGE_MAX_LEN:
@@ -259,9 +350,14 @@ class ChatAnalyzer:
                 if prob >= cfg.MERGE_MIN_PROB:
                     self.merged_words[merged] = (w1, w2, count, prob)
                     jieba.add_word(merged, freq=count * 1000)
+        jieba.dt.total = dict_total
         
         print(f"   合并 {len(self.merged_words)} 个词组")
         
+        # 只有包含新合并词组的文本需要在分词统计阶段重新分词
+        invalidated = self.segment_cache.invalidate(self.merged_words)
+        print(f"   需重新分词: {invalidated} 条")
+        
         # 显示前几个
         if self.merged_words:
             sorted_merges = sorted(self.merged_words.items(), key=lambda x: -x[1][2])[:10]
@@ -270,106 +366,102 @@ class ChatAnalyzer:
 
     def _tokenize_and_count(self):
         """分词统计"""
-        for idx, msg in enumerate(self.messages):
-            # 跳过机器人消息
-            if self._is_bot_message(msg):
-                continue
-            
-            sender_uin = msg.get('sender', {}).get('uin')
-            content = msg.get('content', {})
-            text = content.get('text', '') if isinstance(content, dict) else ''
-            original_text = text
-            cleaned = clean_text(text)
-            
+        workers = getattr(cfg, 'TOKENIZE_WORKERS', 0)
+        if workers and workers > 1 and len(self.cleaned_texts) > 1:
+            try:
+                self._tokenize_and_count_parallel(workers)
+                return
+            except Exception as e:
+                print(f"   ⚠️ 多进程分词失败，改用单进程: {e}")
+                self.word_freq = Counter()
+                self.word_contributors = defaultdict(Counter)
+        
+        sampler = ReservoirSampler(cfg.SAMPLE_COUNT, sample_salt(getattr(cfg, 'SAMPLE_SEED', None)))
+        text_idx = 0
+        for record in self.records:
+            cleaned = record.text
             if not cleaned:
                 continue
+            sender_uin = record.uin
             
-            words = list(jieba.cut(cleaned))
-            emojis = extract_emojis(cleaned)
-            words = [w for w in words if not is_emoji(w)]  # 新增：从words中去掉emoji
-            all_tokens = words + emojis
+            # record 中的有效文本与 cleaned_texts 一一对应、顺序一致
+            words = self.segment_cache.cut(text_idx)
             
-            for word in all_tokens:
-                word = word.strip()
-                if not word:
-                    continue
-                
-                # 跳过纯数字/符号
-                if re.match(r'^[\d\W]+$', word) and not is_emoji(word):
-                    continue
-                
+            for word in iter_count_tokens(words, record.emojis):
                 self.word_freq[word] += 1
                 if sender_uin:
                     self.word_contributors[word][sender_uin] += 1
-                if len(self.word_samples[word]) < cfg.SAMPLE_COUNT * 3:
-                    self.word_samples[word].append(cleaned)
+                sampler.add(word, text_idx)
+            text_idx += 1
+        
+        self.word_sample_ids = sampler.samples
+
+    def _tokenize_and_count_parallel(self, workers):
+        """多进程分词统计，结果与单进程一致"""
+        items = []
+        for record in self.records:
+            if record.text:
+                idx = len(items)
+                items.append((record.text, record.uin, record.emojis,
+                              self.segment_cache.cached_offsets(idx)))
+        
+        # 按主进程加词顺序传给子进程：先新词，后合并词组
+        user_words = [(word, 1000) for word in self.discovered_words]
+        user_words += [(merged, info[2] * 1000) for merged, info in self.merged_words.items()]
+        
+        print(f"   使用 {workers} 个进程分词...")
+        self.word_freq, self.word_contributors, self.word_sample_ids = count_tokens_parallel(
+            items, user_words, workers, cfg.SAMPLE_COUNT, getattr(cfg, 'SAMPLE_SEED', None)
+        )
 
     def _fun_statistics(self):
         """趣味统计"""
         prev_clean = None  # 改用清理后文本
         prev_sender = None
         
-        for msg in self.messages:
-            # 跳过机器人消息
-            if self._is_bot_message(msg):
-                continue
-            
-            sender_uin = msg.get('sender', {}).get('uin')
+        for record in self.records:
+            sender_uin = record.uin
             if not sender_uin:
                 continue
             
-            content = msg.get('content', {})
-            text = content.get('text', '') if isinstance(content, dict) else ''
-            timestamp = msg.get('timestamp', '')
+            flags = record.flags
+            clean = record.text
             
             self.user_msg_count[sender_uin] += 1
-            clean = clean_text(text)
             self.user_char_count[sender_uin] += len(clean)
             
             # 图片检测（排除gif）
-            if '[图片:' in text:
-                if '.gif' not in text.lower():
-                    self.user_image_count[sender_uin] += 1
+            if flags & FLAG_IMAGE:
+                self.user_image_count[sender_uin] += 1
             
             # 转发检测
-            if '[合并转发:' in text:
+            if flags & FLAG_FORWARD:
                 self.user_forward_count[sender_uin] += 1
             
             # 回复统计
-            reply_info = content.get('reply') if isinstance(content, dict) else None
-            if reply_info:
+            if flags & FLAG_REPLY:
                 self.user_reply_count[sender_uin] += 1
-                ref_msg_id = reply_info.get('referencedMessageId')
+                ref_msg_id = record.reply_to
                 if ref_msg_id and ref_msg_id in self.msgid_to_sender:
                     target_uin = self.msgid_to_sender[ref_msg_id]
                     self.user_replied_count[target_uin] += 1
             
             # @统计
-            raw = msg.get('rawMessage', {})
-            elements = raw.get('elements', [])
-            for elem in elements:
-                if elem.get('elementType') == 1:
-                    text_elem = elem.get('textElement', {})
-                    at_type = text_elem.get('atType', 0)
-                    at_uid = text_elem.get('atUid', '')
-                    if at_type > 0 and at_uid and at_uid != '0':
-                        self.user_at_count[sender_uin] += 1
-                        self.user_ated_count[at_uid] += 1
+            for at_uid in record.at_uids:
+                self.user_at_count[sender_uin] += 1
+                self.user_ated_count[at_uid] += 1
             
             # 表情统计（包括emoji、[表情:]、gif）
-            emojis = extract_emojis(clean)
-            gif_count = text.lower().count('.gif')
-            bracket_emoji_count = text.count('[表情:')
-            emoji_count = len(emojis) + bracket_emoji_count + gif_count
+            emoji_count = len(record.emojis) + record.sticker_count
             if emoji_count > 0:
                 self.user_emoji_count[sender_uin] += emoji_count
             
             # 链接统计
-            if '[链接:' in text or re.search(r'https?://', text):
+            if flags & FLAG_LINK:
                 self.user_link_count[sender_uin] += 1
             
             # 时段统计
-            hour = parse_timestamp(timestamp)
+            hour = record.hour
             if hour is not None:
                 self.hour_distribution[hour] += 1
                 if hour in cfg.NIGHT_OWL_HOURS:
@@ -394,105 +486,70 @@ class ChatAnalyzer:
 
     def _filter_results(self):
         """过滤结果"""
-        filtered_freq = Counter()
-        
-        for word, freq in self.word_freq.items():
-            # 长度过滤
-            if len(word) < cfg.MIN_WORD_LEN or len(word) > cfg.MAX_WORD_LEN:
-                continue
-            if freq < cfg.MIN_FREQ:
-                continue
-            
-            # 白名单直接通过
-            if word in cfg.WHITELIST:
-                filtered_freq[word] = freq
-                continue
-            
-            # 黑名单跳过
-            if word in cfg.BLACKLIST:
-                continue
-            
-            # 停用词（emoji除外）
-            if word in cfg.STOPWORDS and not is_emoji(word):
-                continue
-            
-            # 单字特殊处理（采用旧版逻辑）
-            if len(word) == 1:
-                if is_emoji(word):
-                    pass  # emoji保留
-                else:
-                    stats = self.single_char_stats.get(word)
-                    if stats:
-                        total, indep, ratio = stats
-                        if ratio < cfg.SINGLE_MIN_SOLO_RATIO or indep < cfg.SINGLE_MIN_SOLO_COUNT:
-                            continue
-                    else:
-                        continue
-            
-            # 纯数字跳过
-            if re.match(r'^[\d\s]+$', word):
-                continue
-            
-            # 纯标点跳过
-            if all(c in string.punctuation or c in '，。！？；：、""''（）【】' for c in word):
-                continue
-            
-            filtered_freq[word] = freq
+        self.word_filter = WordFilter(cfg, self.single_char_stats)
+        self.word_freq = self.word_filter.apply(self.word_freq)
         
-        self.word_freq = filtered_freq
-        
-        # 采样
-        for word in self.word_samples:
-            samples = self.word_samples[word]
-            if len(samples) > cfg.SAMPLE_COUNT:
-                self.word_samples[word] = random.sample(samples, cfg.SAMPLE_COUNT)
+        # 只保留过滤后词的样本，并按消息时间顺序排列
+        self.word_sample_ids = {
+            word: sorted(ids) for word, ids in self.word_sample_ids.items()
+            if word in self.word_freq
+        }
         
         print(f"   过滤后 {len(self.word_freq)} 个词")
+        print(f"   过滤明细: {self.word_filter.summary()}")
+
+    def _reset_rankings_cache(self):
+        """清空榜单缓存（统计结果变化后调用）"""
+        self._rankings = None
+        self._top_words = None
+        self._top_contributors = {}
 
     def get_top_words(self, n=None):
         n = n or cfg.TOP_N
-        return self.word_freq.most_common(n)
+        if self._top_words is None:
+            self._top_words = top_items(self.word_freq, cfg.TOP_N)
+        if n <= cfg.TOP_N:
+            return self._top_words[:n]
+        return top_items(self.word_freq, n)
+
+    def get_top_contributors(self, word):
+        """词的前 CONTRIBUTOR_TOP_N 名贡献者 [(uin, count)]，按词缓存"""
+        top = self._top_contributors.get(word)
+        if top is None:
+            top = top_items(self.word_contributors.get(word, {}), cfg.CONTRIBUTOR_TOP_N)
+            self._top_contributors[word] = top
+        return top
+
+    def get_word_samples(self, word):
+        """词的样本消息（清理后文本）"""
+        return [self.cleaned_texts[idx] for idx in self.word_sample_ids.get(word, [])]
 
     def get_word_detail(self, word):
         return {
             'word': word,
             'freq': self.word_freq.get(word, 0),
-            'samples': self.word_samples.get(word, []),
+            'samples': self.get_word_samples(word),
             'contributors': [(self.get_name(uin), count) 
-                           for uin, count in self.word_contributors[word].most_common(cfg.CONTRIBUTOR_TOP_N)]
+                           for uin, count in self.get_top_contributors(word)]
         }
 
+    def get_rankings(self):
+        """趣味榜单 {榜单名: [(uin, 数值)]}，首次调用时计算并缓存"""
+        if self._rankings is None:
+            self._rankings = compute_rankings(self, cfg.RANK_TOP_N)
+        return self._rankings
+
     def get_fun_rankings(self):
-        rankings = {}
-        
-        def fmt(counter, top_n=cfg.RANK_TOP_N):
-            return [(self.get_name(uin), count) for uin, count in counter.most_common(top_n)]
-        
-        rankings['话痨榜'] = fmt(self.user_msg_count)
-        rankings['字数榜'] = fmt(self.user_char_count)
-        
-        sorted_avg = sorted(self.user_char_per_msg.items(), key=lambda x: x[1], reverse=True)[:cfg.RANK_TOP_N]
-        rankings['长文王'] = [(self.get_name(uin), f"{avg:.1f}字/条") for uin, avg in sorted_avg]
-        
-        rankings['图片狂魔'] = fmt(self.user_image_count)
-        rankings['合并转发王'] = fmt(self.user_forward_count)
-        rankings['回复狂'] = fmt(self.user_reply_count)
-        rankings['被回复最多'] = fmt(self.user_replied_count)
-        rankings['艾特狂'] = fmt(self.user_at_count)
-        rankings['被艾特最多'] = fmt(self.user_ated_count)
-        rankings['表情帝'] = fmt(self.user_emoji_count)
-        rankings['链接分享王'] = fmt(self.user_link_count)
-        rankings['深夜党'] = fmt(self.user_night_count)
-        rankings['早起鸟'] = fmt(self.user_morning_count)
-        rankings['复读机'] = fmt(self.user_repeat_count)
-        
-        return rankings
+        return {
+            title: [(self.get_name(uin), value) for uin, value in entries]
+            for title, entries in self.get_rankings().items()
+        }
     
     def export_json(self):
         """导出JSON格式结果（包含uin信息）"""
         result = {
             'chatName': self.chat_name,
-            'messageCount': len(self.messages),
+            'messageCount': self.message_count,
             'topWords': [
                 {
                     'word': word,
@@ -503,43 +560,21 @@ class ChatAnalyzer:
                             'uin': uin,
                             'count': count
                         }
-                        for uin, count in self.word_contributors[word].most_common(cfg.CONTRIBUTOR_TOP_N)
+                        for uin, count in self.get_top_contributors(word)
                     ],
-                    'samples': self.word_samples.get(word, [])[:cfg.SAMPLE_COUNT]
+                    'samples': self.get_word_samples(word)
                 }
                 for word, freq in self.get_top_words()
             ],
-            'rankings': {},
+            # 趣味榜单（包含uin）
+            'rankings': {
+                title: [
+                    {'name': self.get_name(uin), 'uin': uin, 'value': value}
+                    for uin, value in entries
+                ]
+                for title, entries in self.get_rankings().items()
+            },
             'hourDistribution': {str(h): self.hour_distribution.get(h, 0) for h in range(24)}
         }
         
-        # 趣味榜单（包含uin）
-        def fmt_with_uin(counter, top_n=cfg.RANK_TOP_N):
-            return [
-                {'name': self.get_name(uin), 'uin': uin, 'value': count}
-                for uin, count in counter.most_common(top_n)
-            ]
-        
-        result['rankings']['话痨榜'] = fmt_with_uin(self.user_msg_count)
-        result['rankings']['字数榜'] = fmt_with_uin(self.user_char_count)
-        
-        # 长文王特殊处理
-        sorted_avg = sorted(self.user_char_per_msg.items(), key=lambda x: x[1], reverse=True)[:cfg.RANK_TOP_N]
-        result['rankings']['长文王'] = [
-            {'name': self.get_name(uin), 'uin': uin, 'value': f"{avg:.1f}字/条"}
-            for uin, avg in sorted_avg
-        ]
-        
-        result['rankings']['图片狂魔'] = fmt_with_uin(self.user_image_count)
-        result['rankings']['合并转发王'] = fmt_with_uin(self.user_forward_count)
-        result['rankings']['回复狂'] = fmt_with_uin(self.user_reply_count)
-        result['rankings']['被回复最多'] = fmt_with_uin(self.user_replied_count)
-        result['rankings']['艾特狂'] = fmt_with_uin(self.user_at_count)
-        result['rankings']['被艾特最多'] = fmt_with_uin(self.user_ated_count)
-        result['rankings']['表情帝'] = fmt_with_uin(self.user_emoji_count)
-        result['rankings']['链接分享王'] = fmt_with_uin(self.user_link_count)
-        result['rankings']['深夜党'] = fmt_with_uin(self.user_night_count)
-        result['rankings']['早起鸟'] = fmt_with_uin(self.user_morning_count)
-        result['rankings']['复读机'] = fmt_with_uin(self.user_repeat_count)
-        
         return result
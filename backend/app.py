@@ -9,8 +9,11 @@ Flask 后端：QQ群年度报告分析器线上版
 
 import os
 import json
+import glob
+import time
 import uuid
-from typing import List, Dict
+import hashlib
+from typing import List, Dict, Optional
 from datetime import datetime
 
 from flask import Flask, request, jsonify, send_file
@@ -31,9 +34,16 @@ if PROJECT_ROOT not in sys.path:
 import config
 import analyzer as analyzer_mod
 from image_generator import ImageGenerator
+from ai_cache import get_ai_cache
+from utils import load_json, load_json_stream
 
 from backend.oss_service import OSSService
 from backend.db_service import DatabaseService
+from backend.job_queue import JobQueue
+from backend.result_cache import ResultCache, file_sha256
+from backend.report_cache import ReportPayloadCache
+from backend.image_export import ReportImageExporter, file_version
+from render_service import get_render_service, is_playwright_available
 
 
 app = Flask(__name__)
@@ -66,16 +76,82 @@ except Exception as e:
     oss_service = None
     db_service = None
 
+TEMP_DIR = os.path.join(PROJECT_ROOT, "runtime_outputs", "temp")
+
+# 分析快照格式版本，快照字段变化时递增
+ANALYSIS_SNAPSHOT_VERSION = 1
+# 分析快照保留时长：期间可以重新选词生成报告，删除报告时一并删除
+SNAPSHOT_RETENTION_SECONDS = float(os.getenv('SNAPSHOT_RETENTION_HOURS', '168')) * 3600
+
+# 预先生成的前端展示数据格式版本，process_report_data_for_frontend 输出变化时递增，
+# 旧版本的报告在查看时重新生成并补写
+FRONTEND_PAYLOAD_VERSION = 1
+
+# 分析结果缓存：同一份聊天记录 + 相同分析配置直接复用结果
+try:
+    result_cache = ResultCache(
+        cache_dir=os.path.join(PROJECT_ROOT, "runtime_outputs", "result_cache"),
+        max_bytes=int(float(os.getenv('RESULT_CACHE_MAX_MB', '200')) * 1024 * 1024)
+    )
+except Exception as e:
+    print(f"⚠️  结果缓存初始化失败: {e}")
+    result_cache = None
+
+# 报告展示数据缓存：报告生成后不再变化，缓存返回给前端的 JSON
+try:
+    report_cache = ReportPayloadCache(
+        max_entries=int(os.getenv('REPORT_CACHE_SIZE', '256')),
+        ttl=float(os.getenv('REPORT_CACHE_TTL', '3600')),
+        disk_dir=(os.path.join(PROJECT_ROOT, "runtime_outputs", "report_cache")
+                  if os.getenv('REPORT_CACHE_DISK', '1') == '1' else None),
+        disk_max_entries=int(os.getenv('REPORT_CACHE_DISK_SIZE', '1024'))
+    )
+except Exception as e:
+    print(f"⚠️  报告缓存初始化失败: {e}")
+    report_cache = None
+
+# 报告图片导出：后台渲染 PNG，按 报告ID + 模板版本 缓存
+IMAGE_CACHE_MAX_AGE = int(os.getenv('IMAGE_CACHE_MAX_AGE', '86400'))
+
+
+def image_template_version() -> str:
+    """模板内容 + 前端数据版本；离线渲染时再加上离线字体，切换模式或更换字体后旧图片失效"""
+    version = (f"{file_version(os.path.join(PROJECT_ROOT, 'templates', 'report_template.html'))}"
+               f"v{FRONTEND_PAYLOAD_VERSION}")
+    if getattr(config, 'OFFLINE_RENDER', False):
+        font_path = getattr(config, 'OFFLINE_FONT_PATH', '')
+        font = file_version(font_path) if font_path and os.path.exists(font_path) else font_path
+        version += f"o{hashlib.sha1(font.encode('utf-8')).hexdigest()[:8]}"
+    return version
+
+
+try:
+    image_exporter = ReportImageExporter(
+        cache_dir=os.path.join(PROJECT_ROOT, "runtime_outputs", "report_images"),
+        template_version=image_template_version(),
+        workers=int(os.getenv('IMAGE_EXPORT_WORKERS', str(getattr(config, 'RENDER_POOL_SIZE', 2))))
+    )
+except Exception as e:
+    print(f"⚠️  图片导出初始化失败: {e}")
+    image_exporter = None
+
+
+def load_chat_data(file_path: str) -> Dict:
+    """加载上传的聊天记录，大文件默认流式读取 messages 避免整体载入内存"""
+    if getattr(config, 'STREAM_JSON_INPUT', True):
+        return load_json_stream(file_path)
+    return load_json(file_path)
+
 
 def generate_ai_comments(selected_word_objects: List[Dict]) -> Dict[str, str]:
     """
     使用OpenAI API为每个热词生成犀利的AI锐评
     返回: {word: comment} 的字典
     """
+    from image_generator import AICommentGenerator
+    # 生成器使用进程内共享的 OpenAI 客户端，构造开销很小
+    ai_gen = AICommentGenerator()
     try:
-        from image_generator import AICommentGenerator
-        ai_gen = AICommentGenerator()
-        
         if ai_gen.client:
             print("🤖 正在生成AI锐评...")
             comments = ai_gen.generate_batch(selected_word_objects)
@@ -87,8 +163,6 @@ def generate_ai_comments(selected_word_objects: List[Dict]) -> Dict[str, str]:
                    for w in selected_word_objects}
     except Exception as e:
         print(f"⚠️ AI锐评生成失败: {e}")
-        from image_generator import AICommentGenerator
-        ai_gen = AICommentGenerator()
         return {w['word']: ai_gen._fallback_comment(w['word']) 
                for w in selected_word_objects}
 
@@ -112,21 +186,27 @@ def health():
         }
     }
     
-    # 检查数据库连接
+    # 检查数据库连接（通过连接池执行简单查询）
     if db_service:
         try:
-            # 尝试执行简单查询
-            conn = db_service._get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            cursor.close()
-            conn.close()
+            db_service.ping()
             health_status["services"]["database"]["status"] = "healthy"
         except Exception as e:
             health_status["ok"] = False
             health_status["services"]["database"]["status"] = "unhealthy"
             health_status["services"]["database"]["error"] = str(e)
+        health_status["services"]["database"]["pool"] = db_service.pool.stats()
+    
+    if result_cache:
+        health_status["services"]["result_cache"] = result_cache.stats()
+    if report_cache:
+        health_status["services"]["report_cache"] = report_cache.stats()
+    ai_cache = get_ai_cache()
+    if ai_cache:
+        health_status["services"]["ai_cache"] = ai_cache.stats()
+    if image_exporter:
+        health_status["services"]["image_export"] = image_exporter.stats()
+        health_status["services"]["image_export"]["renderer"] = get_render_service().stats()
     
     # 检查存储目录
     try:
@@ -156,11 +236,13 @@ def allowed_file(filename):
 @app.route("/api/upload", methods=["POST"])
 def upload_and_analyze():
     """
-    步骤1-4: 上传→临时保存→分析→删除临时文件
-    返回: report_id, 分析结果（热词列表供选择）
+    步骤1: 上传→临时保存→登记分析任务
+    立即返回 job_id，分析在后台任务队列中执行，进度通过 /api/jobs/{job_id} 查询
     """
     if not db_service:
         return jsonify({"error": "数据库服务未初始化"}), 500
+    if not job_queue:
+        return jsonify({"error": "任务队列未初始化"}), 500
     
     file = request.files.get("file")
     if not file:
@@ -173,67 +255,210 @@ def upload_and_analyze():
     # 获取是否AI自动选词
     auto_select = request.form.get("auto_select", "false").lower() == "true"
     
-    # 生成report_id
+    # 生成report_id（同时作为任务ID）
     report_id = str(uuid.uuid4())
     
     # 临时保存文件
-    base_dir = os.path.join(PROJECT_ROOT, "runtime_outputs")
-    temp_dir = os.path.join(base_dir, "temp")
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, f"{report_id}.json")
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    temp_path = os.path.join(TEMP_DIR, f"{report_id}.json")
     file.save(temp_path)
+    
+    # 结果缓存：手动选词模式命中时直接返回热词列表，不进入任务队列
+    cache_key = None
+    if result_cache:
+        try:
+            cache_key = ResultCache.make_key(file_sha256(temp_path), analyzer_mod.config_fingerprint())
+            cached = result_cache.get(cache_key) if not auto_select else None
+        except Exception as e:
+            print(f"⚠️ 读取结果缓存失败: {e}")
+            cached = None
+        if cached is not None:
+            cleanup_temp_files(temp_path, None, None)
+            save_analysis_snapshot(report_id, cached)
+            return jsonify({
+                "job_id": report_id,
+                "report_id": report_id,
+                "status": "done",
+                "cached": True,
+                "result": build_upload_result(report_id, cached)
+            })
 
     try:
-        # 如果启用OSS：上传→获取URL→下载回来分析
-        if oss_service:
-            original_filename = file.filename or "chat.json"
-            oss_key = oss_service.upload_json(temp_path, original_filename)
-            # 这里可以选择从OSS下载回来，或直接使用本地文件
-            # 为简化流程，直接使用本地文件
-            local_file = temp_path
-        else:
-            local_file = temp_path
-        
-        # 解析并分析JSON
-        data = json.load(open(local_file, encoding="utf-8-sig"))
-        analyzer = analyzer_mod.ChatAnalyzer(data)
-        analyzer.analyze()
-        report = analyzer.export_json()
-        
-        # 获取热词列表
-        all_words = report.get('topWords', [])[:100]
-        
-        # 如果是AI自动选词
-        if auto_select:
-            selected_words = [w['word'] for w in all_words[:10]]
-            result = finalize_report(
-                report_id=report_id,
-                analyzer=analyzer,
-                selected_words=selected_words,
-                auto_mode=True
-            )
-            # 删除临时文件
-            cleanup_temp_files(temp_path, oss_service, oss_key if oss_service else None)
-            return result
-        
-        # 手动选词模式：返回热词列表，暂存分析结果
-        # 将analyzer结果保存到临时文件供后续使用
-        result_temp_path = os.path.join(temp_dir, f"{report_id}_result.json")
-        with open(result_temp_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
-        
-        return jsonify({
+        job_queue.submit(report_id, {
             "report_id": report_id,
-            "chat_name": report.get('chatName', '未知群聊'),
-            "message_count": report.get('messageCount', 0),
-            "available_words": all_words
+            "temp_path": temp_path,
+            "original_filename": file.filename or "chat.json",
+            "auto_select": auto_select,
+            "cache_key": cache_key,
         })
     except Exception as exc:
         import traceback
         traceback.print_exc()
-        # 清理临时文件
-        cleanup_temp_files(temp_path, oss_service, None)
-        return jsonify({"error": f"分析失败: {exc}"}), 500
+        cleanup_temp_files(temp_path, None, None)
+        return jsonify({"error": f"创建分析任务失败: {exc}"}), 500
+    
+    return jsonify({
+        "job_id": report_id,
+        "report_id": report_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{report_id}"
+    }), 202
+
+
+def run_upload_job(job_id: str, params: Dict, progress) -> Dict:
+    """
+    步骤2-4（后台任务）: 分析→删除临时文件
+    手动选词返回热词列表并保存分析快照，AI自动选词直接生成报告
+    """
+    report_id = params["report_id"]
+    temp_path = params["temp_path"]
+    total = len(analyzer_mod.ANALYSIS_STAGES) + 2
+    oss_key = None
+    
+    cache_key = params.get("cache_key")
+    report = result_cache.get(cache_key) if (result_cache and cache_key) else None
+    
+    if report is None:
+        try:
+            # 如果启用OSS：上传→获取URL→下载回来分析
+            if oss_service:
+                oss_key = oss_service.upload_json(temp_path, params["original_filename"])
+                # 这里可以选择从OSS下载回来，或直接使用本地文件
+                # 为简化流程，直接使用本地文件
+            
+            # 解析并分析JSON
+            progress("loading", "读取聊天记录", 1, total)
+            data = load_chat_data(temp_path)
+            analyzer = analyzer_mod.ChatAnalyzer(data)
+            analyzer.analyze(progress=lambda stage, label, current, _: progress(stage, label, current + 1, total))
+            progress("exporting", "整理分析结果", total, total)
+            report = analyzer.export_json()
+        finally:
+            # 分析完成后原始聊天记录不再需要（后续选词只用分析快照）
+            cleanup_temp_files(temp_path, oss_service, oss_key)
+        
+        if result_cache and cache_key:
+            try:
+                result_cache.put(cache_key, report)
+            except Exception as e:
+                print(f"⚠️ 写入结果缓存失败: {e}")
+    else:
+        print(f"♻️ 命中分析结果缓存: {report_id}")
+        cleanup_temp_files(temp_path, None, None)
+    
+    # 如果是AI自动选词
+    if params.get("auto_select"):
+        selected_words = [w['word'] for w in report.get('topWords', [])[:10]]
+        return build_final_report(
+            report_id=report_id,
+            report=report,
+            selected_words=selected_words,
+            auto_mode=True
+        )
+    
+    # 手动选词模式：返回热词列表，保存分析快照供选词后最终化
+    save_analysis_snapshot(report_id, report)
+    return build_upload_result(report_id, report)
+
+
+def build_upload_result(report_id: str, report: Dict) -> Dict:
+    """手动选词模式的上传结果：热词列表供选择"""
+    return {
+        "report_id": report_id,
+        "chat_name": report.get('chatName', '未知群聊'),
+        "message_count": report.get('messageCount', 0),
+        "available_words": report.get('topWords', [])[:100]
+    }
+
+
+def is_valid_report_id(report_id: str) -> bool:
+    """report_id 由 uuid4 生成，校验后才能拼进文件路径"""
+    try:
+        return str(uuid.UUID(report_id)) == report_id
+    except (ValueError, TypeError, AttributeError):
+        return False
+
+
+def snapshot_path(report_id: str) -> str:
+    return os.path.join(TEMP_DIR, f"{report_id}_result.json")
+
+
+def save_analysis_snapshot(report_id: str, report: Dict):
+    """
+    保存分析快照：热词（含贡献者和样本）、趣味榜单、时段分布
+    最终化和重新选词都只读快照，不再重新分词分析
+    """
+    snapshot = {
+        "snapshotVersion": ANALYSIS_SNAPSHOT_VERSION,
+        "chatName": report.get('chatName'),
+        "messageCount": report.get('messageCount'),
+        "topWords": report.get('topWords', []),
+        "rankings": report.get('rankings', {}),
+        "hourDistribution": report.get('hourDistribution', {}),
+    }
+    path = snapshot_path(report_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    prune_analysis_snapshots()
+
+
+def prune_analysis_snapshots():
+    """删除超过保留时长的分析快照"""
+    cutoff = time.time() - SNAPSHOT_RETENTION_SECONDS
+    for path in glob.glob(os.path.join(TEMP_DIR, "*_result.json")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def load_analysis_snapshot(report_id: str) -> Optional[Dict]:
+    """读取分析快照，不存在、已过保留时长或版本不兼容时返回 None"""
+    path = snapshot_path(report_id)
+    try:
+        if os.path.getmtime(path) < time.time() - SNAPSHOT_RETENTION_SECONDS:
+            return None
+    except OSError:
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get("snapshotVersion") != ANALYSIS_SNAPSHOT_VERSION:
+        return None
+    return snapshot
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    """查询分析任务状态：排队/运行中（含阶段进度）/完成（含结果）/失败（含错误）"""
+    if not job_queue:
+        return jsonify({"error": "任务队列未初始化"}), 500
+    
+    job = job_queue.get(job_id)
+    if not job:
+        return jsonify({"error": "任务不存在或已过期"}), 404
+    
+    payload = {
+        "job_id": job_id,
+        "status": job['status'],
+        "stage": job['stage'],
+        "stage_label": job['stage_label'],
+        "progress": {
+            "current": job['stage_index'],
+            "total": job['stage_total']
+        }
+    }
+    if 'queue_position' in job:
+        payload["queue_position"] = job['queue_position']
+    if job['stale']:
+        payload["stale"] = True
+    if job['status'] == 'done':
+        payload["result"] = job['result']
+    elif job['status'] == 'failed':
+        payload["error"] = f"分析失败: {job['error']}"
+    return jsonify(payload)
 
 
 @app.route("/api/finalize", methods=["POST"])
@@ -250,104 +475,97 @@ def finalize_report_endpoint():
     
     if not report_id or not selected_words:
         return jsonify({"error": "缺少必要参数"}), 400
+    if not is_valid_report_id(report_id):
+        return jsonify({"error": "report_id 格式错误"}), 400
     
     try:
-        # 从临时文件加载分析结果
-        base_dir = os.path.join(PROJECT_ROOT, "runtime_outputs")
-        temp_dir = os.path.join(base_dir, "temp")
-        result_temp_path = os.path.join(temp_dir, f"{report_id}_result.json")
-        
-        if not os.path.exists(result_temp_path):
+        # 从分析快照加载结果（不再重新分析原始聊天记录）
+        report = load_analysis_snapshot(report_id)
+        if report is None:
             return jsonify({"error": "分析结果已过期，请重新上传"}), 404
         
-        with open(result_temp_path, 'r', encoding='utf-8') as f:
-            report = json.load(f)
-        
-        # 重建analyzer（用于AI锐评）
-        original_json_path = os.path.join(temp_dir, f"{report_id}.json")
-        if os.path.exists(original_json_path):
-            json_data = json.load(open(original_json_path, encoding="utf-8-sig"))
-            analyzer = analyzer_mod.ChatAnalyzer(json_data)
-            analyzer.analyze()
-        else:
-            analyzer = None
-        
-        result = finalize_report(
+        result = build_final_report(
             report_id=report_id,
-            analyzer=analyzer,
+            report=report,
             selected_words=selected_words,
-            auto_mode=False,
-            report_data=report
+            auto_mode=False
         )
         
-        # 清理临时文件
-        cleanup_temp_files(result_temp_path, None, None)
-        if os.path.exists(original_json_path):
-            cleanup_temp_files(original_json_path, None, None)
+        # 快照保留到报告删除或过期，期间可以重新选词；重新生成后旧的展示数据和图片失效
+        if report_cache:
+            report_cache.invalidate(report_id)
+        if image_exporter:
+            image_exporter.invalidate(report_id)
         
-        return result
+        return jsonify(result)
     except Exception as exc:
         import traceback
         traceback.print_exc()
         return jsonify({"error": f"生成失败: {exc}"}), 500
 
 
-def finalize_report(report_id: str, analyzer, selected_words: List[str], 
-                   auto_mode: bool = False, report_data: Dict = None):
-    """
-    共用的报告最终化逻辑
-    步骤5-7: 选词 + AI锐评 + 保存MySQL（只存关键数据）
-    """
-    try:
-        if report_data is None:
-            report = analyzer.export_json()
+def build_final_report(report_id: str, report: Dict, selected_words: List[str],
+                       auto_mode: bool = False) -> Dict:
+    """选词 + AI锐评 + 保存MySQL，返回结果字典，失败时抛出异常"""
+    # 转换selected_words为详细对象
+    all_words = {w['word']: w for w in report.get('topWords', [])}
+    selected_word_objects = []
+    for word in selected_words:
+        if word in all_words:
+            selected_word_objects.append(all_words[word])
         else:
-            report = report_data
-        
-        # 转换selected_words为详细对象
-        all_words = {w['word']: w for w in report.get('topWords', [])}
-        selected_word_objects = []
-        for word in selected_words:
-            if word in all_words:
-                selected_word_objects.append(all_words[word])
-            else:
-                selected_word_objects.append({"word": word, "freq": 0, "samples": []})
-        
-        # 生成AI锐评（传入字典列表）
-        ai_comments = generate_ai_comments(selected_word_objects)
-        
-        # 提取关键统计数据（只保留前端展示需要的）
-        statistics = {
-            "chatName": report.get('chatName'),
-            "messageCount": report.get('messageCount'),
-            "rankings": report.get('rankings', {}),
-            "timeDistribution": report.get('timeDistribution', {}),
-            "hourDistribution": report.get('hourDistribution', {})
-        }
-        
-        # 保存到MySQL（只保存关键数据）
-        success = db_service.create_report(
-            report_id=report_id,
-            chat_name=statistics['chatName'],
-            message_count=statistics['messageCount'],
-            selected_words=selected_word_objects,
-            statistics=statistics,
-            ai_comments=ai_comments
-        )
-        
-        if not success:
-            return jsonify({"error": "保存数据库失败"}), 500
-        
-        return jsonify({
-            "success": True,
+            selected_word_objects.append({"word": word, "freq": 0, "samples": []})
+    
+    # 生成AI锐评（传入字典列表）
+    ai_comments = generate_ai_comments(selected_word_objects)
+    
+    # 提取关键统计数据（只保留前端展示需要的）
+    statistics = {
+        "chatName": report.get('chatName'),
+        "messageCount": report.get('messageCount'),
+        "rankings": report.get('rankings', {}),
+        "timeDistribution": report.get('timeDistribution', {}),
+        "hourDistribution": report.get('hourDistribution', {})
+    }
+    
+    # 预先生成前端展示数据，查看报告时直接返回
+    created_at = datetime.now().replace(microsecond=0)
+    frontend_payload = None
+    try:
+        frontend_payload = serialize_frontend_payload(process_report_data_for_frontend({
             "report_id": report_id,
-            "report_url": f"/report/{report_id}",
-            "message": "报告已生成" if not auto_mode else "AI已自动完成选词并生成报告"
-        })
-    except Exception as exc:
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": f"最终化失败: {exc}"}), 500
+            "chat_name": statistics['chatName'],
+            "message_count": statistics['messageCount'],
+            "selected_words": selected_word_objects,
+            "statistics": statistics,
+            "ai_comments": ai_comments,
+            "created_at": created_at
+        }))
+    except Exception as e:
+        print(f"⚠️ 生成前端展示数据失败，查看时再生成: {e}")
+    
+    # 保存到MySQL（只保存关键数据）
+    success = db_service.create_report(
+        report_id=report_id,
+        chat_name=statistics['chatName'],
+        message_count=statistics['messageCount'],
+        selected_words=selected_word_objects,
+        statistics=statistics,
+        ai_comments=ai_comments,
+        frontend_payload=frontend_payload,
+        payload_version=FRONTEND_PAYLOAD_VERSION,
+        created_at=created_at
+    )
+    
+    if not success:
+        raise RuntimeError("保存数据库失败")
+    
+    return {
+        "success": True,
+        "report_id": report_id,
+        "report_url": f"/report/{report_id}",
+        "message": "报告已生成" if not auto_mode else "AI已自动完成选词并生成报告"
+    }
 
 
 def cleanup_temp_files(file_path: str, oss_service, oss_key: str = None):
@@ -375,12 +593,28 @@ def list_reports():
     if not db_service:
         return jsonify({"error": "数据库服务未初始化"}), 500
     
-    page = int(request.args.get('page', 1))
-    page_size = int(request.args.get('page_size', 20))
+    page_size = min(max(int(request.args.get('page_size', 20)), 1), 100)
     chat_name = request.args.get('chat_name')
     
     try:
-        result = db_service.list_reports(page, page_size, chat_name)
+        # 兼容旧的页码分页；不传 page 时使用游标分页
+        if 'page' in request.args:
+            page = int(request.args.get('page', 1))
+            result = db_service.list_reports(page, page_size, chat_name)
+            return jsonify(result)
+        
+        total = request.args.get('total', 'none')
+        if total not in ('none', 'approx', 'exact'):
+            return jsonify({"error": "total 只能是 none、approx 或 exact"}), 400
+        try:
+            result = db_service.list_reports_keyset(
+                page_size=page_size,
+                chat_name=chat_name,
+                cursor=request.args.get('cursor'),
+                total=total
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
         return jsonify(result)
     except Exception as exc:
         return jsonify({"error": f"查询失败: {exc}"}), 500
@@ -397,14 +631,35 @@ def get_report(report_id):
         return jsonify({"error": "数据库服务未初始化"}), 500
     
     try:
-        report = db_service.get_report(report_id)
-        if not report:
-            return jsonify({"error": "报告不存在"}), 404
+        use_cache = report_cache is not None and is_valid_report_id(report_id)
+        entry = report_cache.get(report_id) if use_cache else None
         
-        # 使用ImageGenerator的数据处理逻辑
-        processed_data = process_report_data_for_frontend(report)
+        if entry is None:
+            row = db_service.get_report_payload(report_id, FRONTEND_PAYLOAD_VERSION)
+            if not row:
+                return jsonify({"error": "报告不存在"}), 404
+            
+            if row['report'] is None:
+                # 生成报告时已保存展示数据，直接返回
+                body = row['frontend_payload'].encode('utf-8')
+            else:
+                # 旧报告：用同一次查询取回的原始字段生成展示数据，并补写回数据库
+                payload = serialize_frontend_payload(process_report_data_for_frontend(row['report']))
+                db_service.save_report_payload(report_id, payload, FRONTEND_PAYLOAD_VERSION)
+                body = payload.encode('utf-8')
+            
+            if not use_cache:
+                return app.response_class(body, mimetype='application/json')
+            entry = report_cache.put(report_id, body)
         
-        return jsonify(processed_data)
+        # 客户端已有相同内容时返回 304
+        if entry.etag in request.if_none_match:
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(entry.body, mimetype='application/json')
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
     except Exception as exc:
         import traceback
         traceback.print_exc()
@@ -419,6 +674,12 @@ def delete_report(report_id):
     
     try:
         success = db_service.delete_report(report_id)
+        if report_cache:
+            report_cache.invalidate(report_id)
+        if image_exporter and is_valid_report_id(report_id):
+            image_exporter.invalidate(report_id)
+        if is_valid_report_id(report_id):
+            cleanup_temp_files(snapshot_path(report_id), None, None)
         if not success:
             return jsonify({"error": "报告不存在"}), 404
         
@@ -427,12 +688,69 @@ def delete_report(report_id):
         return jsonify({"error": f"删除失败: {exc}"}), 500
 
 
-def process_report_data_for_frontend(report):
+@app.route("/api/reports/<report_id>/image", methods=["GET"])
+def get_report_image(report_id):
     """
-    使用ImageGenerator的逻辑处理报告数据为前端需要的格式
-    复用image_generator.py中的_prepare_template_data方法
+    获取报告的 PNG 图片
+    已渲染时直接返回缓存文件；否则提交后台渲染并返回 202，客户端稍后重试
     """
-    # 构建一个临时的ImageGenerator实例来使用其数据处理方法
+    if not db_service:
+        return jsonify({"error": "数据库服务未初始化"}), 500
+    if not is_valid_report_id(report_id):
+        return jsonify({"error": "report_id 格式错误"}), 400
+    if not image_exporter or not is_playwright_available():
+        return jsonify({"error": "图片导出不可用（需要安装 playwright 和 chromium）"}), 503
+    
+    path = image_exporter.get_cached(report_id)
+    if path:
+        return send_file(
+            path,
+            mimetype='image/png',
+            download_name=f"{report_id}.png",
+            etag=image_exporter.etag(report_id),
+            max_age=IMAGE_CACHE_MAX_AGE,
+            conditional=True
+        )
+    
+    state = image_exporter.status(report_id)
+    if state['status'] == 'failed':
+        return jsonify({"error": f"图片生成失败: {state['error']}"}), 500
+    
+    if state['status'] == 'missing':
+        try:
+            report = db_service.get_report(report_id)
+        except Exception as exc:
+            return jsonify({"error": f"获取失败: {exc}"}), 500
+        if not report:
+            return jsonify({"error": "报告不存在"}), 404
+        image_exporter.submit(report_id, lambda output_path: render_report_image(report, output_path))
+    
+    response = jsonify({"status": "rendering", "report_id": report_id})
+    response.status_code = 202
+    response.headers['Retry-After'] = '2'
+    return response
+
+
+def render_report_image(report: Dict, output_path: str):
+    """生成报告 HTML 并截图为 PNG（在图片导出线程中执行），失败时抛出异常"""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    html_path = os.path.join(TEMP_DIR, f"{report['report_id']}_image.html")
+    try:
+        if not build_report_generator(report).generate_html(html_path):
+            raise RuntimeError("生成HTML失败")
+        get_render_service().render(html_path, output_path)
+    finally:
+        if os.path.exists(html_path):
+            os.remove(html_path)
+
+
+def serialize_frontend_payload(payload: Dict) -> str:
+    """前端展示数据序列化为 JSON 文本（与 jsonify 输出格式一致）"""
+    return app.json.dumps(payload)
+
+
+def build_report_generator(report) -> ImageGenerator:
+    """由数据库中的报告构建 ImageGenerator，用于生成前端展示数据和报告图片"""
     # 模拟json_data结构
     json_data = {
         'chatName': report['chat_name'],
@@ -442,11 +760,19 @@ def process_report_data_for_frontend(report):
         'hourDistribution': report['statistics'].get('hourDistribution', {})
     }
     
-    # 创建ImageGenerator实例
-    gen = ImageGenerator()
+    gen = ImageGenerator(output_dir=TEMP_DIR)
     gen.json_data = json_data
     gen.selected_words = report['selected_words']  # 设置选中的词
     gen.ai_comments = report.get('ai_comments', {}) or {}  # 设置AI评语
+    return gen
+
+
+def process_report_data_for_frontend(report):
+    """
+    使用ImageGenerator的逻辑处理报告数据为前端需要的格式
+    复用image_generator.py中的_prepare_template_data方法
+    """
+    gen = build_report_generator(report)
     
     # 调用其数据处理方法
     template_data = gen._prepare_template_data()
@@ -503,6 +829,26 @@ def get_demo_file():
         return jsonify({"error": "演示文件不存在"}), 404
 
 
+# 分析任务队列：jieba 词典是进程级全局状态，默认单线程串行分析，并发上传排队等待
+try:
+    job_queue = JobQueue(
+        db_path=os.path.join(PROJECT_ROOT, "runtime_outputs", "jobs.db"),
+        handler=run_upload_job,
+        workers=int(os.getenv('ANALYSIS_WORKERS', '1')),
+        retention_hours=float(os.getenv('JOB_RETENTION_HOURS', '24')),
+        lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', '120')),
+        can_resume=lambda params: os.path.exists(params.get("temp_path", ""))
+    )
+    # 每个 worker 进程启动时都会执行，只接管已退出进程或租约过期的任务，不会重复入队；
+    # 运行期间其他 worker 退出留下的任务由续约线程定期接管
+    resumed = job_queue.recover()
+    if resumed:
+        print(f"🔁 已恢复 {resumed} 个未完成的分析任务")
+except Exception as e:
+    print(f"⚠️  任务队列初始化失败: {e}")
+    job_queue = None
+
+
 @app.errorhandler(404)
 def not_found(error):
     """404 错误处理"""
@@ -511,9 +857,10 @@ def not_found(error):
         "message": "请检查 API 路径是否正确",
         "available_endpoints": [
             "GET /api/health - 健康检查",
-            "POST /api/upload - 上传并分析",
+            "POST /api/upload - 上传并创建分析任务",
+            "GET /api/jobs/{id} - 查询分析任务进度",
             "POST /api/finalize - 完成报告",
-            "GET /api/reports - 查询报告列表",
+            "GET /api/reports - 查询报告列表（cursor 游标分页，total=none|approx|exact）",
             "GET /api/reports/{id} - 获取报告详情",
             "DELETE /api/reports/{id} - 删除报告",
             "GET /api/demo - 下载演示数据"
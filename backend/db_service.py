@@ -8,13 +8,193 @@
 import pymysql
 import json
 import os
+import base64
 import sys
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+class PoolTimeout(Exception):
+    """等待空闲连接超时"""
+
+
+class ConnectionPool:
+    """
+    线程安全的 MySQL 连接池
+    - 连接数在 min_size ~ max_size 之间，池满时等待归还，超过 timeout 抛出 PoolTimeout
+    - 取出空闲超过 ping_interval 秒的连接时先 ping，失效则丢弃重建
+    - 空闲超过 max_idle 秒的多余连接（超出 min_size 的部分）会被关闭
+    """
+
+    def __init__(self, connect_kwargs: Dict[str, Any], min_size: int = 1, max_size: int = 10,
+                 timeout: float = 10, max_idle: float = 300, ping_interval: float = 30):
+        self.connect_kwargs = connect_kwargs
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+
+        self._idle = deque()  # (conn, 归还时间)，右端为最近归还
+        self._size = 0        # 已创建且未关闭的连接数（含空闲和使用中）
+        self._cond = threading.Condition()
+        self._metrics = {'created': 0, 'closed': 0, 'waits': 0, 'timeouts': 0, 'failed_checks': 0}
+
+    def _connect(self):
+        conn = pymysql.connect(**self.connect_kwargs)
+        with self._cond:
+            self._metrics['created'] += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._metrics['closed'] += 1
+            self._cond.notify()
+
+    def fill(self):
+        """预先建立 min_size 个连接"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _take_stale(self, now):
+        """取出超出 min_size 且空闲过久的连接（在锁内调用），由调用方在锁外关闭"""
+        stale = []
+        while self._idle and self._size - len(stale) > self.min_size:
+            conn, released_at = self._idle[0]
+            if now - released_at <= self.max_idle:
+                break
+            self._idle.popleft()
+            stale.append(conn)
+        return stale
+
+    def acquire(self):
+        """取出一个可用连接"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    stale = self._take_stale(now)
+                    if stale:
+                        break
+                    if self._idle:
+                        conn, released_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._metrics['timeouts'] += 1
+                        raise PoolTimeout(f"等待数据库连接超时（{self.timeout}秒）")
+                    if not waited:
+                        self._metrics['waits'] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+
+            if stale:
+                for stale_conn in stale:
+                    self._close(stale_conn)
+                continue
+
+            if create:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            # 空闲较久的连接先检查是否仍然可用
+            if now - released_at > self.ping_interval:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    with self._cond:
+                        self._metrics['failed_checks'] += 1
+                    self._close(conn)
+                    continue
+            return conn
+
+    def release(self, conn, discard: bool = False):
+        """归还连接；结束未提交的事务，出错或 discard 时关闭连接"""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        if discard or not conn.open:
+            self._close(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ...，连接层错误时丢弃该连接"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                **self._metrics
+            }
+
+
 class DatabaseService:
     def __init__(self):
         # 从环境变量读取配置
@@ -26,10 +206,28 @@ class DatabaseService:
             'database': os.getenv('MYSQL_DATABASE', 'qq_reports'),
             'charset': os.getenv('MYSQL_CHARSET', 'utf8mb4')
         }
+        self.pool = ConnectionPool(
+            self.config,
+            min_size=int(os.getenv('MYSQL_POOL_MIN_SIZE', '1')),
+            max_size=int(os.getenv('MYSQL_POOL_MAX_SIZE', '10')),
+            timeout=float(os.getenv('MYSQL_POOL_TIMEOUT', '10')),
+            max_idle=float(os.getenv('MYSQL_POOL_MAX_IDLE', '300')),
+            ping_interval=float(os.getenv('MYSQL_POOL_PING_INTERVAL', '30'))
+        )
+        self.has_frontend_payload = False
+        self.has_chat_name_fulltext = False
     
     def get_connection(self):
-        """获取数据库连接"""
-        return pymysql.connect(**self.config)
+        """从连接池获取数据库连接（with 语句，结束后自动归还）"""
+        return self.pool.connection()
+    
+    def ping(self) -> bool:
+        """健康检查：从连接池取连接执行 SELECT 1"""
+        with self.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        return True
     
     def init_database(self):
         """初始化数据库和表结构"""
@@ -56,17 +254,33 @@ class DatabaseService:
                     selected_words JSON NOT NULL COMMENT '选中的热词列表（包含word, freq, samples, contributors等）',
                     statistics JSON NOT NULL COMMENT '关键统计数据（rankings, timeDistribution等）',
                     ai_comments JSON COMMENT 'AI锐评内容 {word: comment}',
+                    frontend_payload MEDIUMTEXT COMMENT '预先生成的前端展示JSON',
+                    payload_version SMALLINT COMMENT 'frontend_payload 的格式版本',
                     
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                     
                     INDEX idx_chat_name (chat_name),
-                    INDEX idx_created_at (created_at)
+                    INDEX idx_created_at (created_at),
+                    FULLTEXT INDEX ft_chat_name (chat_name) WITH PARSER ngram
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """)
             
             conn.commit()
+            
+            # 旧库需运行 migrate_db.py 添加 frontend_payload 列，未迁移时读取走实时生成
+            cursor.execute("SHOW COLUMNS FROM reports LIKE 'frontend_payload'")
+            self.has_frontend_payload = cursor.fetchone() is not None
+            if not self.has_frontend_payload:
+                print("⚠️  reports 表缺少 frontend_payload 列，请运行 backend/migrate_db.py")
+            cursor.execute("SHOW INDEX FROM reports WHERE Key_name = 'ft_chat_name'")
+            self.has_chat_name_fulltext = cursor.fetchone() is not None
+            if not self.has_chat_name_fulltext:
+                print("⚠️  reports 表缺少群名全文索引，搜索将使用 LIKE，请运行 backend/migrate_db.py")
             print("✅ 数据库初始化成功")
+            
+            # 预先建立连接池的最小连接数
+            self.pool.fill()
         except Exception as e:
             print(f"❌ 数据库初始化失败: {e}")
             raise
@@ -76,98 +290,168 @@ class DatabaseService:
     
     def create_report(self, report_id: str, chat_name: str, message_count: int,
                      selected_words: List[Dict], statistics: Dict, 
-                     ai_comments: Optional[Dict] = None) -> bool:
-        """创建报告记录（只存关键数据）"""
-        conn = None
+                     ai_comments: Optional[Dict] = None,
+                     frontend_payload: Optional[str] = None,
+                     payload_version: Optional[int] = None,
+                     created_at: Optional[datetime] = None) -> bool:
+        """
+        创建报告记录（只存关键数据，可同时保存预先生成的前端展示JSON）
+        报告已存在时（重新选词后再次生成）覆盖内容，保留原创建时间
+        """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            sql = """
-                INSERT INTO reports 
-                (report_id, chat_name, message_count, selected_words, statistics, ai_comments)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            cursor.execute(sql, (
-                report_id,
-                chat_name,
-                message_count,
-                json.dumps(selected_words, ensure_ascii=False),
-                json.dumps(statistics, ensure_ascii=False),
-                json.dumps(ai_comments, ensure_ascii=False) if ai_comments else None
-            ))
-            
-            conn.commit()
-            return True
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                columns = ['report_id', 'chat_name', 'message_count',
+                           'selected_words', 'statistics', 'ai_comments']
+                values = [
+                    report_id,
+                    chat_name,
+                    message_count,
+                    json.dumps(selected_words, ensure_ascii=False),
+                    json.dumps(statistics, ensure_ascii=False),
+                    json.dumps(ai_comments, ensure_ascii=False) if ai_comments else None
+                ]
+                if created_at is not None:
+                    columns.append('created_at')
+                    values.append(created_at)
+                if self.has_frontend_payload:
+                    # 重新生成时即使新的展示数据为空也要覆盖，避免返回旧内容
+                    columns += ['frontend_payload', 'payload_version']
+                    values += [frontend_payload, payload_version if frontend_payload is not None else None]
+                
+                updates = [c for c in columns if c not in ('report_id', 'created_at')]
+                sql = f"""
+                    INSERT INTO reports 
+                    ({', '.join(columns)})
+                    VALUES ({', '.join(['%s'] * len(values))})
+                    ON DUPLICATE KEY UPDATE {', '.join(f"{c} = VALUES({c})" for c in updates)}
+                """
+                cursor.execute(sql, values)
+                
+                conn.commit()
+                return True
         except Exception as e:
+            # 未提交的事务在连接归还时回滚
             print(f"创建报告失败: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
+    
+    # 生成前端展示数据所需的原始字段（旧报告没有预先生成的展示数据时使用）
+    REPORT_SOURCE_COLUMNS = ['report_id', 'chat_name', 'message_count', 'selected_words',
+                             'statistics', 'ai_comments', 'created_at']
+    
+    def get_report_payload(self, report_id: str, payload_version: int) -> Optional[Dict[str, Any]]:
+        """
+        一次查询读取报告的前端展示JSON（不解析），报告不存在返回 None
+        返回 {'frontend_payload': str 或 None, 'payload_version': int 或 None, 'report': dict 或 None}
+        展示数据缺失或版本不是 payload_version 时，report 为同一行的原始字段（已解析JSON），
+        否则为 None（这些字段不从数据库传回）
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+                if self.has_frontend_payload:
+                    current = "frontend_payload IS NOT NULL AND payload_version = %s"
+                    sources = ', '.join(f"CASE WHEN {current} THEN NULL ELSE {c} END AS {c}"
+                                        for c in self.REPORT_SOURCE_COLUMNS)
+                    cursor.execute(
+                        f"SELECT frontend_payload, payload_version, ({current}) AS payload_current, {sources} "
+                        f"FROM reports WHERE report_id = %s",
+                        [payload_version] * (len(self.REPORT_SOURCE_COLUMNS) + 1) + [report_id]
+                    )
+                else:
+                    cursor.execute(
+                        f"SELECT {', '.join(self.REPORT_SOURCE_COLUMNS)} FROM reports WHERE report_id = %s",
+                        (report_id,)
+                    )
+                row = cursor.fetchone()
+        except Exception as e:
+            print(f"获取报告展示数据失败: {e}")
+            return None
+        
+        if not row:
+            return None
+        if row.get('payload_current'):
+            return {'frontend_payload': row['frontend_payload'],
+                    'payload_version': row['payload_version'], 'report': None}
+        report = self._parse_report_row({c: row[c] for c in self.REPORT_SOURCE_COLUMNS})
+        return {'frontend_payload': row.get('frontend_payload'),
+                'payload_version': row.get('payload_version'), 'report': report}
+    
+    def save_report_payload(self, report_id: str, frontend_payload: str, payload_version: int) -> bool:
+        """补写旧报告的前端展示JSON"""
+        if not self.has_frontend_payload:
+            return False
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE reports SET frontend_payload = %s, payload_version = %s WHERE report_id = %s",
+                    (frontend_payload, payload_version, report_id)
+                )
+                conn.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"保存报告展示数据失败: {e}")
+            return False
     
     def get_report(self, report_id: str) -> Optional[Dict[str, Any]]:
         """获取报告详情（返回JSON数据供前端渲染）"""
-        conn = None
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-            
-            sql = "SELECT * FROM reports WHERE report_id = %s"
-            cursor.execute(sql, (report_id,))
-            result = cursor.fetchone()
-            
-            if result:
-                # 解析JSON字段
-                if result.get('selected_words'):
-                    result['selected_words'] = json.loads(result['selected_words'])
-                if result.get('statistics'):
-                    result['statistics'] = json.loads(result['statistics'])
-                if result.get('ai_comments'):
-                    result['ai_comments'] = json.loads(result['ai_comments'])
+            with self.get_connection() as conn:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+                
+                sql = "SELECT * FROM reports WHERE report_id = %s"
+                cursor.execute(sql, (report_id,))
+                result = cursor.fetchone()
             
-            return result
+            return self._parse_report_row(result) if result else result
         except Exception as e:
             print(f"获取报告失败: {e}")
             return None
-        finally:
-            if conn:
-                conn.close()
+    
+    @staticmethod
+    def _parse_report_row(result: Dict[str, Any]) -> Dict[str, Any]:
+        """解析报告行中的JSON字段"""
+        if result.get('selected_words'):
+            result['selected_words'] = json.loads(result['selected_words'])
+        if result.get('statistics'):
+            result['statistics'] = json.loads(result['statistics'])
+        if result.get('ai_comments'):
+            result['ai_comments'] = json.loads(result['ai_comments'])
+        return result
     
     def list_reports(self, page: int = 1, page_size: int = 20, 
                     chat_name: Optional[str] = None) -> Dict[str, Any]:
-        """分页查询报告列表"""
-        conn = None
+        """按页码分页查询报告列表（OFFSET 分页，深页较慢，新代码请用 list_reports_keyset）"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(pymysql.cursors.DictCursor)
-            
-            # 构建查询条件
-            where_clause = ""
-            params = []
-            if chat_name:
-                where_clause = "WHERE chat_name LIKE %s"
-                params.append(f"%{chat_name}%")
-            
-            # 查询总数
-            count_sql = f"SELECT COUNT(*) as total FROM reports {where_clause}"
-            cursor.execute(count_sql, params)
-            total = cursor.fetchone()['total']
-            
-            # 查询数据
-            offset = (page - 1) * page_size
-            data_sql = f"""
-                SELECT id, report_id, chat_name, message_count, 
-                       created_at, updated_at
-                FROM reports 
-                {where_clause}
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """
-            cursor.execute(data_sql, params + [page_size, offset])
-            data = cursor.fetchall()
+            with self.get_connection() as conn:
+                cursor = conn.cursor(pymysql.cursors.DictCursor)
+                
+                # 构建查询条件
+                where_clause = ""
+                params = []
+                if chat_name:
+                    condition, params = self._chat_name_condition(chat_name)
+                    where_clause = f"WHERE {condition}"
+                
+                # 查询总数
+                count_sql = f"SELECT COUNT(*) as total FROM reports {where_clause}"
+                cursor.execute(count_sql, params)
+                total = cursor.fetchone()['total']
+                
+                # 查询数据
+                offset = (page - 1) * page_size
+                data_sql = f"""
+                    SELECT id, report_id, chat_name, message_count, 
+                           created_at, updated_at
+                    FROM reports 
+                    {where_clause}
+                    ORDER BY created_at DESC
+                    LIMIT %s OFFSET %s
+                """
+                cursor.execute(data_sql, params + [page_size, offset])
+                data = cursor.fetchall()
             
             return {
                 'data': data,
@@ -178,27 +462,117 @@ class DatabaseService:
         except Exception as e:
             print(f"查询报告列表失败: {e}")
             return {'data': [], 'total': 0, 'page': page, 'page_size': page_size}
-        finally:
-            if conn:
-                conn.close()
     
-    def delete_report(self, report_id: str) -> bool:
-        """删除报告"""
-        conn = None
+    @staticmethod
+    def encode_cursor(created_at: datetime, row_id: int) -> str:
+        """把 (created_at, id) 编码为分页游标"""
+        raw = f"{created_at.isoformat()}|{row_id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """解析分页游标，格式错误时抛出 ValueError"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            created_at, row_id = raw.split('|')
+            return datetime.fromisoformat(created_at), int(row_id)
+        except Exception:
+            raise ValueError("分页游标格式错误")
+    
+    def _chat_name_condition(self, chat_name: str):
+        """
+        群名搜索条件：有 ngram 全文索引时用 MATCH ... AGAINST 短语匹配，
+        关键词短于 ngram 长度（默认2）或没有全文索引时退回 LIKE
+        """
+        if self.has_chat_name_fulltext and len(chat_name) >= 2:
+            phrase = '"' + chat_name.replace('"', ' ') + '"'
+            return "MATCH(chat_name) AGAINST (%s IN BOOLEAN MODE)", [phrase]
+        return "chat_name LIKE %s", [f"%{chat_name}%"]
+    
+    def list_reports_keyset(self, page_size: int = 20, chat_name: Optional[str] = None,
+                            cursor: Optional[str] = None, total: str = 'none') -> Dict[str, Any]:
+        """
+        按 (created_at, id) 倒序的游标分页，每页耗时与翻到第几页无关
+        cursor 为上一页返回的 next_cursor；total 为 'none' / 'approx' / 'exact'，
+        approx 在不按群名过滤时读取 information_schema 的估算行数
+        """
+        conditions = []
+        params = []
+        if chat_name:
+            condition, condition_params = self._chat_name_condition(chat_name)
+            conditions.append(condition)
+            params += condition_params
+        filter_conditions = list(conditions)
+        filter_params = list(params)
+        
+        if cursor:
+            created_at, row_id = self.decode_cursor(cursor)
+            conditions.append("(created_at < %s OR (created_at = %s AND id < %s))")
+            params += [created_at, created_at, row_id]
+        
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        try:
+            with self.get_connection() as conn:
+                db_cursor = conn.cursor(pymysql.cursors.DictCursor)
+                
+                # 多取一条判断是否还有下一页
+                db_cursor.execute(f"""
+                    SELECT id, report_id, chat_name, message_count, 
+                           created_at, updated_at
+                    FROM reports 
+                    {where_clause}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, params + [page_size + 1])
+                data = list(db_cursor.fetchall())
+                
+                result_total = None
+                total_is_estimate = False
+                if total == 'approx' and not chat_name:
+                    db_cursor.execute("""
+                        SELECT TABLE_ROWS AS total FROM information_schema.TABLES
+                        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'reports'
+                    """)
+                    row = db_cursor.fetchone()
+                    result_total = int(row['total'] or 0) if row else None
+                    total_is_estimate = True
+                elif total in ('approx', 'exact'):
+                    filter_clause = f"WHERE {' AND '.join(filter_conditions)}" if filter_conditions else ""
+                    db_cursor.execute(f"SELECT COUNT(*) AS total FROM reports {filter_clause}", filter_params)
+                    result_total = db_cursor.fetchone()['total']
             
-            sql = "DELETE FROM reports WHERE report_id = %s"
-            cursor.execute(sql, (report_id,))
+            has_more = len(data) > page_size
+            data = data[:page_size]
+            next_cursor = None
+            if has_more and data:
+                last = data[-1]
+                next_cursor = self.encode_cursor(last['created_at'], last['id'])
             
-            conn.commit()
-            return cursor.rowcount > 0
+            return {
+                'data': data,
+                'page_size': page_size,
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'total': result_total,
+                'total_is_estimate': total_is_estimate
+            }
+        except Exception as e:
+            print(f"查询报告列表失败: {e}")
+            return {'data': [], 'page_size': page_size, 'next_cursor': None,
+                    'has_more': False, 'total': None, 'total_is_estimate': False}
+    
+    def delete_report(self, report_id: str) -> bool:
+        """删除报告"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                
+                sql = "DELETE FROM reports WHERE report_id = %s"
+                cursor.execute(sql, (report_id,))
+                
+                conn.commit()
+                return cursor.rowcount > 0
         except Exception as e:
             print(f"删除报告失败: {e}")
-            if conn:
-                conn.rollback()
             return False
-        finally:
-            if conn:
-                conn.close()
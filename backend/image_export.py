@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告图片导出：在后台线程池中渲染 PNG，结果按 报告ID + 模板版本 缓存在本地磁盘
+同一报告同时只渲染一次，Flask 请求线程只负责提交任务和返回缓存文件
+"""
+
+import os
+import glob
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+
+def file_version(path: str) -> str:
+    """文件内容哈希的前 12 位，模板修改后旧图片自动失效"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+class ReportImageExporter:
+    def __init__(self, cache_dir: str, template_version: str, workers: int = 2):
+        self.cache_dir = cache_dir
+        self.template_version = template_version
+        self.rendered = 0
+        self.failed = 0
+        self._pending = {}  # report_id -> Future
+        self._errors = {}   # report_id -> 最近一次渲染失败的原因
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='image-export')
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, report_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{report_id}_{self.template_version}.png")
+
+    def etag(self, report_id: str) -> str:
+        return f"{report_id}-{self.template_version}"
+
+    def get_cached(self, report_id: str) -> Optional[str]:
+        path = self.cache_path(report_id)
+        return path if os.path.exists(path) else None
+
+    def status(self, report_id: str) -> Dict:
+        """返回 {"status": "done"|"rendering"|"failed"|"missing", ...}；failed 只返回一次，之后可重新提交"""
+        if self.get_cached(report_id):
+            return {"status": "done"}
+        with self._lock:
+            if report_id in self._pending:
+                return {"status": "rendering"}
+            if report_id in self._errors:
+                return {"status": "failed", "error": self._errors.pop(report_id)}
+        return {"status": "missing"}
+
+    def submit(self, report_id: str, render: Callable[[str], None]):
+        """提交渲染任务，render(output_path) 负责生成 PNG；已在渲染中的报告不重复提交"""
+        with self._lock:
+            if report_id in self._pending:
+                return
+            self._errors.pop(report_id, None)
+            self._pending[report_id] = self._executor.submit(self._run, report_id, render)
+
+    def _run(self, report_id: str, render: Callable[[str], None]):
+        path = self.cache_path(report_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp.png"
+        try:
+            render(tmp_path)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self.rendered += 1
+        except Exception as e:
+            print(f"⚠️ 报告图片渲染失败 {report_id}: {e}")
+            with self._lock:
+                self.failed += 1
+                self._errors[report_id] = str(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        finally:
+            with self._lock:
+                self._pending.pop(report_id, None)
+
+    def invalidate(self, report_id: str):
+        """删除报告后调用，清除该报告所有模板版本的图片"""
+        for path in glob.glob(os.path.join(self.cache_dir, f"{report_id}_*.png")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "template_version": self.template_version,
+                "rendering": len(self._pending),
+                "rendered": self.rendered,
+                "failed": self.failed
+            }
@@ -57,12 +57,15 @@ def init_database():
                     selected_words JSON NOT NULL COMMENT '选中的热词列表（包含word, freq, samples, contributors等）',
                     statistics JSON NOT NULL COMMENT '关键统计数据（rankings, timeDistribution等）',
                     ai_comments JSON COMMENT 'AI锐评内容 {word: comment}',
+                    frontend_payload MEDIUMTEXT COMMENT '预先生成的前端展示JSON',
+                    payload_version SMALLINT COMMENT 'frontend_payload 的格式版本',
                     
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                     
                     INDEX idx_chat_name (chat_name),
-                    INDEX idx_created_at (created_at)
+                    INDEX idx_created_at (created_at),
+                    FULLTEXT INDEX ft_chat_name (chat_name) WITH PARSER ngram
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """)
             print("✓ 报告表已创建")
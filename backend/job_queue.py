@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析任务队列：上传后立即返回任务ID，分析在后台有界线程池中执行
+任务状态和进度保存在本地 SQLite，服务重启后未完成的任务会重新入队
+
+多个进程（如 gunicorn -w 4）可共用同一个数据库：每个任务记录所属进程（owner）和租约，
+进程持有任务期间定期续约；执行前按 owner 原子认领，恢复时只接管所属进程已退出或租约过期的任务，
+同一任务不会被多个进程重复执行
+"""
+
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
+
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class JobQueue:
+    """
+    handler(job_id, params, progress) 执行任务并返回可 JSON 序列化的结果，
+    progress(stage, label, current, total) 用于上报阶段进度；
+    can_resume(params) 判断被中断的任务能否重新执行，为空时全部重新执行
+    """
+
+    def __init__(self, db_path: str, handler: Callable, workers: int = 1,
+                 retention_hours: float = 24, lease_seconds: float = 120,
+                 can_resume: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.db_path = db_path
+        self.handler = handler
+        self.can_resume = can_resume
+        self.retention_seconds = retention_hours * 3600
+        self.lease_seconds = lease_seconds
+        # 主机名:进程号:随机后缀，进程号被复用时也不会误认旧进程的任务
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._init_db()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers),
+                                            thread_name_prefix='analysis-job')
+        threading.Thread(target=self._heartbeat, name='analysis-job-lease', daemon=True).start()
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """打开连接并在一个事务中执行，结束后关闭连接"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    stage_label TEXT,
+                    stage_index INTEGER DEFAULT 0,
+                    stage_total INTEGER DEFAULT 0,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'owner' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            if 'lease_until' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    def _heartbeat(self):
+        """定期为本进程持有的排队中/执行中任务续约，并接管已退出进程留下的任务"""
+        while True:
+            time.sleep(max(1.0, self.lease_seconds / 4))
+            try:
+                with self._lock, self._connect() as conn:
+                    conn.execute("UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                                 (time.time() + self.lease_seconds, self.owner, JOB_QUEUED, JOB_RUNNING))
+            except Exception as e:
+                print(f"⚠️  任务租约续期失败: {e}")
+                continue
+            try:
+                resumed = self.recover()
+                if resumed:
+                    print(f"🔁 已接管 {resumed} 个中断的分析任务")
+            except Exception as e:
+                print(f"⚠️  恢复中断任务失败: {e}")
+
+    def _update(self, job_id: str, **fields):
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?",
+                         list(fields.values()) + [job_id])
+
+    def submit(self, job_id: str, params: Dict[str, Any]) -> str:
+        """登记任务并放入线程池排队，返回 job_id"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, stage, stage_label, params, owner, lease_until, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, JOB_QUEUED, 'queued', '排队中', json.dumps(params, ensure_ascii=False),
+                 self.owner, now + self.lease_seconds, now, now)
+            )
+        self._executor.submit(self._run, job_id, params)
+        self.prune()
+        return job_id
+
+    def _claim(self, job_id: str) -> bool:
+        """原子地把本进程排队中的任务标记为执行中；任务已被其他进程接管时返回 False"""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, stage = 'started', stage_label = '开始处理', "
+                "lease_until = ?, updated_at = ? WHERE job_id = ? AND status = ? AND owner = ?",
+                (JOB_RUNNING, now + self.lease_seconds, now, job_id, JOB_QUEUED, self.owner)
+            )
+            return cursor.rowcount == 1
+
+    def _run(self, job_id: str, params: Dict[str, Any]):
+        if not self._claim(job_id):
+            return
+
+        def progress(stage, label, current, total):
+            self._update(job_id, stage=stage, stage_label=label,
+                         stage_index=current, stage_total=total)
+
+        try:
+            result = self.handler(job_id, params, progress)
+            self._update(job_id, status=JOB_DONE, stage='done', stage_label='完成',
+                         result=json.dumps(result, ensure_ascii=False, default=str))
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self._update(job_id, status=JOB_FAILED, stage='failed', stage_label='失败',
+                         error=str(e))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """查询任务状态，不存在返回 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if not row:
+                return None
+            job = dict(row)
+            # 所属进程已退出且尚未被其他进程接管
+            job['stale'] = (job['status'] in (JOB_QUEUED, JOB_RUNNING)
+                            and (job['lease_until'] or 0) < time.time())
+            if job['status'] == JOB_QUEUED:
+                job['queue_position'] = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?",
+                    (JOB_QUEUED, job['created_at'])
+                ).fetchone()[0]
+
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def _owner_gone(self, owner: Optional[str], lease_until: Optional[float]) -> bool:
+        """任务所属进程已退出（同一主机上进程不存在）或租约已过期"""
+        if not owner:
+            return True
+        host, pid, _ = owner.rsplit(':', 2)
+        if host == socket.gethostname():
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return True
+            except (PermissionError, ValueError):
+                pass
+        return (lease_until or 0) < time.time()
+
+    def _take_over(self, conn, job_id: str, old_owner: Optional[str], **fields) -> bool:
+        """仅当任务仍属于 old_owner 时改写，多个进程同时恢复时只有一个成功"""
+        fields['updated_at'] = time.time()
+        columns = ', '.join(f"{name} = ?" for name in fields)
+        cursor = conn.execute(
+            f"UPDATE jobs SET {columns} WHERE job_id = ? AND owner IS ? AND status IN (?, ?)",
+            list(fields.values()) + [job_id, old_owner, JOB_QUEUED, JOB_RUNNING]
+        )
+        return cursor.rowcount == 1
+
+    def recover(self, can_resume: Callable[[Dict[str, Any]], bool] = None) -> int:
+        """
+        恢复所属进程已退出或租约过期的未完成任务：can_resume(params) 为真的由本进程接管并重新入队，
+        其余标记失败；其他存活进程持有的任务不受影响。返回重新入队的任务数
+        启动时调用一次，之后由续约线程定期调用；can_resume 为空时使用构造时传入的判断
+        """
+        can_resume = can_resume or self.can_resume
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT job_id, params, owner, lease_until FROM jobs "
+                "WHERE status IN (?, ?) AND (owner IS NULL OR owner != ?) ORDER BY created_at",
+                (JOB_QUEUED, JOB_RUNNING, self.owner)
+            ).fetchall()
+
+        resumed = 0
+        for row in rows:
+            if not self._owner_gone(row['owner'], row['lease_until']):
+                continue
+            params = json.loads(row['params'])
+            with self._lock, self._connect() as conn:
+                if can_resume is None or can_resume(params):
+                    taken = self._take_over(conn, row['job_id'], row['owner'],
+                                            status=JOB_QUEUED, stage='queued', stage_label='排队中',
+                                            stage_index=0, stage_total=0, owner=self.owner,
+                                            lease_until=time.time() + self.lease_seconds)
+                    if not taken:
+                        continue
+                else:
+                    self._take_over(conn, row['job_id'], row['owner'],
+                                    status=JOB_FAILED, stage='failed', stage_label='失败',
+                                    error='处理进程已退出，任务已中断，请重新上传')
+                    continue
+            self._executor.submit(self._run, row['job_id'], params)
+            resumed += 1
+        return resumed
+
+    def prune(self):
+        """删除超过保留时间的已结束任务"""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                         (JOB_DONE, JOB_FAILED, cutoff))
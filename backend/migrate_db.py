@@ -106,6 +106,23 @@ def migrate():
                 ALTER TABLE reports ADD COLUMN is_public BOOLEAN DEFAULT FALSE AFTER share_token;
             """
         },
+        # 预先生成的前端展示数据，旧报告在查看时补写
+        {
+            "version": 3,
+            "description": "添加预生成的前端展示数据列",
+            "sql": """
+                ALTER TABLE reports ADD COLUMN frontend_payload MEDIUMTEXT NULL COMMENT '预先生成的前端展示JSON' AFTER ai_comments;
+                ALTER TABLE reports ADD COLUMN payload_version SMALLINT NULL COMMENT 'frontend_payload 的格式版本' AFTER frontend_payload;
+            """
+        },
+        # 群名搜索使用 ngram 全文索引，替代 LIKE '%x%' 全表扫描
+        {
+            "version": 4,
+            "description": "添加群名 ngram 全文索引",
+            "sql": """
+                ALTER TABLE reports ADD FULLTEXT INDEX ft_chat_name (chat_name) WITH PARSER ngram;
+            """
+        },
         # 可以继续添加更多迁移...
     ]
     
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告展示数据缓存：缓存 GET /api/reports/<id> 返回给前端的完整 JSON
+报告最终化后不再修改，按 LRU + TTL 保存在进程内存中，可选本地磁盘作为二级缓存
+（磁盘缓存同样按 TTL 和条数上限清理，定期按修改时间淘汰最旧的文件）；删除报告时失效。每条缓存带 ETag，客户端重复访问时可直接返回 304
+
+启用磁盘缓存时，磁盘文件是多个 worker 进程共享的权威副本：内存命中前先核对磁盘文件仍存在且
+修改时间未变，其他进程删除或更新报告后本进程不会继续返回旧数据。未启用磁盘缓存时只适合单进程部署
+"""
+
+import os
+import glob
+import time
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Optional
+
+# disk_mtime：写入/读取时磁盘文件的修改时间（纳秒），用于判断内存副本是否仍有效
+CachedPayload = namedtuple('CachedPayload', ['body', 'etag', 'expires_at', 'disk_mtime'], defaults=(None,))
+
+# 磁盘缓存清理的频率：每写入 PRUNE_EVERY_PUTS 次或间隔 PRUNE_INTERVAL 秒清理一次
+PRUNE_EVERY_PUTS = 50
+PRUNE_INTERVAL = 60
+
+
+class ReportPayloadCache:
+    def __init__(self, max_entries: int = 256, ttl: float = 3600, disk_dir: Optional[str] = None,
+                 disk_max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries if disk_max_entries is not None else max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+        self._last_prune = time.time()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._prune_disk()
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return hashlib.sha1(body).hexdigest()
+
+    def _disk_path(self, report_id: str) -> str:
+        return os.path.join(self.disk_dir, f"{report_id}.json")
+
+    def _prune_disk(self):
+        """删除过期的磁盘缓存和残留的临时文件，超出条数上限时按修改时间删除最旧的"""
+        now = time.time()
+        files = []
+        for path in glob.glob(os.path.join(self.disk_dir, '*')):
+            try:
+                mtime = os.path.getmtime(path)
+                if mtime + self.ttl <= now:
+                    os.remove(path)
+                elif path.endswith('.json'):
+                    files.append((mtime, path))
+            except OSError:
+                pass
+
+        if len(files) > self.disk_max_entries:
+            files.sort()
+            for _, path in files[:len(files) - self.disk_max_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _maybe_prune_disk(self):
+        now = time.time()
+        with self._lock:
+            self._puts_since_prune += 1
+            if self._puts_since_prune < PRUNE_EVERY_PUTS and now - self._last_prune < PRUNE_INTERVAL:
+                return
+            self._puts_since_prune = 0
+            self._last_prune = now
+        self._prune_disk()
+
+    def _disk_mtime(self, report_id: str) -> Optional[int]:
+        try:
+            return os.stat(self._disk_path(report_id)).st_mtime_ns
+        except OSError:
+            return None
+
+    def _remember(self, report_id: str, entry: CachedPayload):
+        with self._lock:
+            self._entries[report_id] = entry
+            self._entries.move_to_end(report_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, report_id: str) -> Optional[CachedPayload]:
+        """先查内存，再查磁盘；过期或磁盘副本已被删除/更新视为未命中"""
+        now = time.time()
+        disk_mtime = self._disk_mtime(report_id) if self.disk_dir else None
+        with self._lock:
+            entry = self._entries.get(report_id)
+            if entry is not None:
+                if entry.expires_at > now and (not self.disk_dir or entry.disk_mtime == disk_mtime):
+                    self._entries.move_to_end(report_id)
+                    self.hits += 1
+                    return entry
+                del self._entries[report_id]
+
+        if disk_mtime is not None:
+            path = self._disk_path(report_id)
+            try:
+                expires_at = disk_mtime / 1e9 + self.ttl
+                if expires_at > now:
+                    with open(path, 'rb') as f:
+                        body = f.read()
+                    entry = CachedPayload(body, self.make_etag(body), expires_at, disk_mtime)
+                    self._remember(report_id, entry)
+                    self.disk_hits += 1
+                    return entry
+                os.remove(path)
+            except OSError:
+                pass
+
+        self.misses += 1
+        return None
+
+    def put(self, report_id: str, body: bytes) -> CachedPayload:
+        """缓存序列化后的 JSON，返回带 ETag 的缓存项"""
+        disk_mtime = None
+        if self.disk_dir:
+            path = self._disk_path(report_id)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+                disk_mtime = self._disk_mtime(report_id)
+            except OSError as e:
+                print(f"⚠️ 写入报告缓存失败: {e}")
+            self._maybe_prune_disk()
+        entry = CachedPayload(body, self.make_etag(body), time.time() + self.ttl, disk_mtime)
+        self._remember(report_id, entry)
+        return entry
+
+    def invalidate(self, report_id: str):
+        """删除报告后调用，同时清除内存和磁盘缓存"""
+        with self._lock:
+            self._entries.pop(report_id, None)
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(report_id))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk": bool(self.disk_dir),
+            "disk_max_entries": self.disk_max_entries if self.disk_dir else 0
+        }
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析结果缓存：按 上传文件内容哈希 + 分析配置指纹 缓存 export_json 的结果
+同一份聊天记录重复上传时直接复用，不再重新分析；本地磁盘按总大小做 LRU 淘汰
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Optional, Dict
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """分块计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """以文件修改时间作为最近使用时间的磁盘 LRU 缓存"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{content_hash}:{fingerprint}".encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict]:
+        """读取缓存，命中时刷新最近使用时间"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return report
+
+    def put(self, key: str, report: Dict):
+        """写入缓存（先写临时文件再替换），然后按总大小淘汰最久未用的条目"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self) -> int:
+        """淘汰最久未使用的条目直到总大小不超过上限，返回淘汰数"""
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+            evicted = 0
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+            return evicted
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "max_bytes": self.max_bytes}
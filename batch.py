@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成年度报告：多进程并行分析多个群的聊天记录导出
+
+Usage:
+    python batch.py <目录或通配符> [...] [--workers N] [--output-dir DIR]
+                    [--select auto|ai] [--ai] [--image] [--force]
+
+    每个输入文件的 txt/json/html（及可选的 png）写入 output-dir/<文件名>/ 下，
+    单个群的详细日志写入同目录的 batch.log。
+    输入文件、分析配置和生成选项都未变化且输出齐全的群会被跳过（--force 强制重新生成）
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config as cfg
+from utils import load_json, load_json_stream, sanitize_filename
+import analyzer as analyzer_mod
+from analyzer import ChatAnalyzer, ANALYSIS_STAGES
+from report_generator import ReportGenerator
+from image_generator import ImageGenerator
+
+
+MANIFEST_NAME = 'batch_manifest.json'
+
+
+def collect_inputs(patterns):
+    """展开目录和通配符，返回去重排序后的 JSON 文件列表（跳过本工具生成的分析结果）"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '*.json'))
+        else:
+            matches = glob.glob(pattern)
+        for path in matches:
+            if os.path.isfile(path) and not path.endswith('_分析结果.json'):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def group_output_dir(output_dir, input_path):
+    """每个输入文件单独一个输出目录，避免同名群的输出互相覆盖"""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, sanitize_filename(stem))
+
+
+def input_signature(input_path, options):
+    """判断输出是否最新的依据：文件大小、修改时间、分析配置指纹、生成选项"""
+    stat = os.stat(input_path)
+    return {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'config': analyzer_mod.config_fingerprint(),
+        'options': options
+    }
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, manifest):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(entry, signature):
+    if not entry or entry.get('signature') != signature:
+        return False
+    return all(os.path.exists(p) for p in entry.get('outputs', []))
+
+
+def _init_worker():
+    # 并行度由进程池提供，工作进程内不再启动分词子进程
+    cfg.TOKENIZE_WORKERS = 0
+
+
+def process_group(task):
+    """
+    在工作进程中处理一个群：加载 → 分析 → txt/json/html
+    详细输出写入该群目录下的 batch.log，返回结果摘要
+    """
+    input_path, out_dir, options = task
+    os.makedirs(out_dir, exist_ok=True)
+    result = {
+        'input': input_path,
+        'out_dir': out_dir,
+        'chat_name': None,
+        'messages': 0,
+        'timings': {},
+        'outputs': [],
+        'html': None,
+        'error': None
+    }
+    timings = result['timings']
+    started = time.perf_counter()
+
+    with open(os.path.join(out_dir, 'batch.log'), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log):
+        try:
+            t = time.perf_counter()
+            if getattr(cfg, 'STREAM_JSON_INPUT', True):
+                data = load_json_stream(input_path)
+            else:
+                data = load_json(input_path)
+            analyzer = ChatAnalyzer(data)
+            timings['load'] = time.perf_counter() - t
+
+            # 通过进度回调记录每个分析阶段的耗时
+            marks = []
+            analyzer.analyze(progress=lambda stage, label, current, total:
+                             marks.append((stage, time.perf_counter())))
+            marks.append((None, time.perf_counter()))
+            for (stage, begin), (_, end) in zip(marks, marks[1:]):
+                timings[stage] = end - begin
+
+            result['chat_name'] = analyzer.chat_name
+            result['messages'] = analyzer.message_count
+            safe_name = sanitize_filename(analyzer.chat_name)
+
+            t = time.perf_counter()
+            ReportGenerator(analyzer, output_dir=out_dir).generate_file_report()
+            json_path = os.path.join(out_dir, f"{safe_name}_分析结果.json")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(analyzer.export_json(), f, ensure_ascii=False, indent=2)
+            result['outputs'] += [os.path.join(out_dir, f"{safe_name}_年度热词报告.txt"), json_path]
+            timings['report'] = time.perf_counter() - t
+
+            t = time.perf_counter()
+            img_gen = ImageGenerator(analyzer, output_dir=out_dir)
+            html_path, _ = img_gen.generate(
+                auto_select=options['select'] == 'auto',
+                ai_select=options['select'] == 'ai',
+                non_interactive=True,
+                generate_image=False,  # 图片由主进程的截图服务统一渲染
+                enable_ai=options['ai']
+            )
+            timings['html'] = time.perf_counter() - t
+            if not html_path:
+                raise RuntimeError("生成HTML失败")
+            result['html'] = html_path
+            result['outputs'].append(html_path)
+        except Exception as e:
+            import traceback
+            traceback.print_exc(file=sys.stdout)
+            result['error'] = str(e) or type(e).__name__
+
+    result['elapsed'] = time.perf_counter() - started
+    return result
+
+
+def render_png(render, result):
+    """在主进程的渲染线程中截图，与后续群的分析并行进行"""
+    t = time.perf_counter()
+    png_path = os.path.splitext(result['html'])[0] + '.png'
+    try:
+        render.render(result['html'], png_path)
+        result['outputs'].append(png_path)
+    except Exception as e:
+        result['error'] = f"图片生成失败: {e}"
+    result['timings']['image'] = time.perf_counter() - t
+    return result
+
+
+def print_summary(results, skipped, wall):
+    done = [r for r in results if not r['error']]
+    failed = [r for r in results if r['error']]
+    messages = sum(r['messages'] for r in done)
+
+    print("\n" + "=" * 60)
+    print("📊 批量生成汇总")
+    print("=" * 60)
+    print(f"✅ 完成: {len(done)}    ⏭️ 跳过: {skipped}    ❌ 失败: {len(failed)}")
+    print(f"📝 消息总数: {messages:,}")
+    print(f"⏱️ 总耗时: {wall:.1f}s")
+    if wall > 0 and done:
+        print(f"🚀 吞吐量: {messages / wall:,.0f} 条/秒, {len(done) / wall * 60:.1f} 个群/分钟")
+
+    if done:
+        stages = ['load'] + [key for key, _ in ANALYSIS_STAGES] + ['report', 'html', 'image']
+        labels = dict(ANALYSIS_STAGES, load='加载文件', report='txt/json 报告', html='HTML 报告', image='图片渲染')
+        print("\n各阶段耗时（合计 / 平均）:")
+        for stage in stages:
+            values = [r['timings'][stage] for r in done if stage in r['timings']]
+            if values:
+                print(f"  {sum(values):>9.2f}s {sum(values) / len(values):>8.2f}s  {labels[stage]}")
+
+    for r in failed:
+        print(f"❌ {os.path.basename(r['input'])}: {r['error']}（详见 {os.path.join(r['out_dir'], 'batch.log')}）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量生成QQ群年度报告")
+    parser.add_argument('inputs', nargs='+', help="聊天记录 JSON 文件、所在目录或通配符")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="并行进程数（默认 CPU 核数）")
+    parser.add_argument('--output-dir', default='batch_outputs', help="输出目录（默认 batch_outputs）")
+    parser.add_argument('--select', choices=['auto', 'ai'], default='auto',
+                        help="热词选择方式：auto 取前10个（默认），ai 使用AI选词")
+    parser.add_argument('--ai', action=argparse.BooleanOptionalAction, default=cfg.AI_COMMENT_MODE == 'always',
+                        help="生成AI锐评（AI_COMMENT_MODE = 'always' 时默认开启）")
+    parser.add_argument('--image', action=argparse.BooleanOptionalAction, default=cfg.IMAGE_GENERATION_MODE == 'always',
+                        help="同时生成PNG图片（IMAGE_GENERATION_MODE = 'always' 时默认开启）")
+    parser.add_argument('--force', action='store_true', help="忽略已有输出，全部重新生成")
+    args = parser.parse_args()
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("❌ 未找到聊天记录文件")
+        sys.exit(1)
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    options = {'select': args.select, 'ai': args.ai, 'image': args.image}
+
+    tasks = []
+    signatures = {}
+    for path in inputs:
+        signatures[path] = input_signature(path, options)
+        if args.force or not is_up_to_date(manifest.get(path), signatures[path]):
+            tasks.append((path, group_output_dir(output_dir, path), options))
+    skipped = len(inputs) - len(tasks)
+
+    workers = max(1, min(args.workers, len(tasks) or 1))
+    print(f"📂 共 {len(inputs)} 个文件，待生成 {len(tasks)} 个，跳过 {skipped} 个（输出已是最新）")
+    print(f"⚙️ 并行进程: {workers}    输出目录: {output_dir}")
+    print("=" * 60)
+
+    results = []
+    started = time.perf_counter()
+    if tasks:
+        render = None
+        if args.image:
+            from render_service import get_render_service, is_playwright_available
+            if is_playwright_available():
+                render = get_render_service()
+            else:
+                print("⚠️ 未安装 playwright，跳过图片生成")
+
+        def finish(result):
+            results.append(result)
+            name = result['chat_name'] or os.path.basename(result['input'])
+            if result['error']:
+                print(f"❌ [{len(results)}/{len(tasks)}] {name}: {result['error']}")
+                return
+
+            print(f"✅ [{len(results)}/{len(tasks)}] {name}  {result['messages']:,} 条  "
+                  f"{result['elapsed']:.1f}s")
+            manifest[result['input']] = {
+                'signature': signatures[result['input']],
+                'chat_name': result['chat_name'],
+                'outputs': result['outputs']
+            }
+            save_manifest(manifest_path, manifest)
+
+        # 截图交给有界线程池（并发数与截图服务页面池一致），主循环继续接收分析结果
+        renders = []
+        with ThreadPoolExecutor(max_workers=render.pool_size if render else 1,
+                                thread_name_prefix='batch-render') as render_pool:
+            # maxtasksperchild=1：jieba 词典是进程级状态，每个群使用全新的进程分析
+            with multiprocessing.Pool(workers, initializer=_init_worker, maxtasksperchild=1) as pool:
+                for result in pool.imap_unordered(process_group, tasks):
+                    if not result['error'] and render:
+                        renders.append(render_pool.submit(render_png, render, result))
+                    else:
+                        finish(result)
+                    for future in [f for f in renders if f.done()]:
+                        renders.remove(future)
+                        finish(future.result())
+
+            for future in as_completed(renders):
+                finish(future.result())
+
+    print_summary(results, skipped, time.perf_counter() - started)
+    if any(r['error'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
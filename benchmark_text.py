@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本清洗基准测试：验证 utils 中的清洗函数与旧实现结果一致，并比较耗时
+
+Usage:
+    python benchmark_text.py [chat.json] [--repeat N]
+
+    chat.json: 可选，qq-chat-exporter 导出的聊天记录；不传则使用演示数据加边界样例
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+
+import utils
+from utils import load_json
+
+
+# ============================================
+# 旧实现（作为对照基准，保持原样）
+# ============================================
+
+def legacy_extract_emojis(text):
+    emoji_pattern = re.compile(
+        "["
+        "\U0001F600-\U0001F64F"
+        "\U0001F300-\U0001F5FF"
+        "\U0001F680-\U0001F6FF"
+        "\U0001F1E0-\U0001F1FF"
+        "\U00002702-\U000027B0"
+        "\U0001F900-\U0001F9FF"
+        "\U0001FA00-\U0001FA6F"
+        "\U0001FA70-\U0001FAFF"
+        "\U00002600-\U000026FF"
+        "\U00002300-\U000023FF"
+        "]",
+        flags=re.UNICODE
+    )
+    return emoji_pattern.findall(text)
+
+
+def legacy_is_emoji(char):
+    if len(char) != 1:
+        return False
+    code = ord(char)
+    emoji_ranges = [
+        (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
+        (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x1F900, 0x1F9FF),
+        (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2600, 0x26FF), (0x2300, 0x23FF),
+    ]
+    return any(start <= code <= end for start, end in emoji_ranges)
+
+
+def legacy_clean_text(text):
+    if not text:
+        return ""
+    text = re.sub(r'\[回复\s+[^\]]*\]', '', text)
+    text = re.sub(r'@[^\n]*?(?=\s+[\u4e00-\u9fffa-zA-Z])', '', text)
+    text = re.sub(r'@[^\n]*$', '', text)
+    prev = None
+    while prev != text:
+        prev = text
+        text = re.sub(r'\[[^\[\]]*\]', '', text)
+    text = re.sub(r'https?://\S+', '', text)
+    text = re.sub(r'www\.\S+', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+
+def legacy_analyze_single_chars(texts):
+    total_count = Counter()
+    solo_count = Counter()
+    boundary_count = Counter()
+    punctuation = set('，。！？、；：""''（）,.!?;:\'"()[]【】《》<>…—～·')
+
+    for text in texts:
+        for char in text:
+            if re.match(r'^[\u4e00-\u9fffa-zA-Z]$', char):
+                total_count[char] += 1
+
+        clean_chars = [c for c in text if re.match(r'^[\u4e00-\u9fffa-zA-Z]$', c)]
+        if len(clean_chars) == 1:
+            solo_count[clean_chars[0]] += 1
+
+        for i, char in enumerate(text):
+            if not re.match(r'^[\u4e00-\u9fffa-zA-Z]$', char):
+                continue
+            left_ok = (i == 0) or (text[i-1] in punctuation) or (text[i-1].isspace())
+            right_ok = (i == len(text)-1) or (text[i+1] in punctuation) or (text[i+1].isspace())
+            if left_ok and right_ok:
+                boundary_count[char] += 1
+
+    result = {}
+    for char in total_count:
+        total = total_count[char]
+        solo = solo_count[char]
+        boundary = boundary_count[char]
+        independent = solo + boundary * 0.5
+        ratio = independent / total if total > 0 else 0
+        result[char] = (total, independent, ratio)
+    return result
+
+
+# ============================================
+# 测试语料
+# ============================================
+
+EDGE_CASES = [
+    "",
+    "[图片: a.jpg]",
+    "[回复 张三: 在吗] 好的",
+    "[[嵌套]括号] 还在",
+    "[a[b]",
+    "a]b[c]d",
+    "[x[y]z",
+    "]]]][[[[",
+    "@张三 (群主) 你好",
+    "@某人",
+    "@甲 @乙 一起来",
+    "看这个 https://example.com/a?b=1 好东西",
+    "www.example.com 和 http://x.y",
+    "  多  余\t空白\n换行  ",
+    "哈 哈 , 好!",
+    "单",
+    "a",
+    "😂😂👍 笑死",
+    "　全角空格　",
+    "[表情: 微笑][表情: 大笑]哈哈哈",
+    "yyds！绝绝子。",
+]
+
+
+def build_corpus(json_path=None, size=50000):
+    """读取聊天记录中的原始文本；未指定文件时用演示数据生成器造数据"""
+    if json_path:
+        data = load_json(json_path)
+        texts = []
+        for msg in data.get('messages', []):
+            content = msg.get('content', {})
+            texts.append(content.get('text', '') if isinstance(content, dict) else '')
+    else:
+        from generate_demo_data import generate_demo_chat
+        random.seed(42)
+        texts = []
+        while len(texts) < size:
+            texts.extend(m['content']['text'] for m in generate_demo_chat()['messages'])
+        texts = texts[:size]
+        # 混入边界样例
+        for i, case in enumerate(EDGE_CASES):
+            texts[i * 97 % len(texts)] = case
+    return texts + EDGE_CASES
+
+
+def timed(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本清洗基准测试")
+    parser.add_argument('json_path', nargs='?', help="聊天记录 JSON（可选）")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数，取最快一次")
+    args = parser.parse_args()
+
+    texts = build_corpus(args.json_path)
+    print(f"📝 语料: {len(texts)} 条")
+    print("=" * 60)
+
+    cleaned = [utils.clean_text(t) for t in texts]
+    all_chars = [c for t in texts for c in t]
+    cases = [
+        ('clean_text',
+         lambda: [legacy_clean_text(t) for t in texts],
+         lambda: [utils.clean_text(t) for t in texts]),
+        ('extract_emojis',
+         lambda: [legacy_extract_emojis(t) for t in cleaned],
+         lambda: [utils.extract_emojis(t) for t in cleaned]),
+        ('is_emoji',
+         lambda: [legacy_is_emoji(c) for c in all_chars],
+         lambda: [utils.is_emoji(c) for c in all_chars]),
+        ('analyze_single_chars',
+         lambda: legacy_analyze_single_chars(cleaned),
+         lambda: utils.analyze_single_chars(cleaned)),
+    ]
+
+    all_equal = True
+    for name, legacy, current in cases:
+        legacy_time, legacy_result = timed(legacy, args.repeat)
+        current_time, current_result = timed(current, args.repeat)
+        equal = legacy_result == current_result
+        all_equal = all_equal and equal
+        speedup = legacy_time / current_time if current_time > 0 else float('inf')
+        print(f"  {name:<22} 旧 {legacy_time:>7.3f}s  新 {current_time:>7.3f}s  "
+              f"x{speedup:>5.1f}  {'✅ 一致' if equal else '❌ 不一致'}")
+
+    print("=" * 60)
+    if not all_equal:
+        print("❌ 存在不一致的结果")
+        sys.exit(1)
+    print("✅ 所有函数结果一致")
+
+
+if __name__ == '__main__':
+    main()
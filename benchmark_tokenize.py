@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分词统计基准测试：验证多进程分词与单进程的词频、贡献者和热词样本完全一致，并比较耗时
+另检查同一条消息中重复出现的词不会在样本中产生重复的消息
+
+Usage:
+    python benchmark_tokenize.py [chat.json] [--workers N] [--seed S]
+
+    chat.json: 可选，qq-chat-exporter 导出的聊天记录；不传则使用演示数据
+"""
+
+import sys
+import time
+import random
+import argparse
+import contextlib
+from collections import Counter, defaultdict
+
+import jieba
+
+import config as cfg
+from utils import load_json, analyze_single_chars
+from analyzer import ChatAnalyzer
+from segmenter import ReservoirSampler, sample_salt, iter_count_tokens, count_tokens_parallel
+
+
+def build_chat(json_path=None, size=20000):
+    """读取聊天记录；未指定文件时用演示数据生成器造数据"""
+    if json_path:
+        return load_json(json_path)
+    from generate_demo_data import generate_demo_chat
+    random.seed(42)
+    data = generate_demo_chat()
+    while len(data['messages']) < size:
+        data['messages'].extend(generate_demo_chat()['messages'])
+    data['messages'] = data['messages'][:size]
+    return data
+
+
+def snapshot(analyzer):
+    return (
+        dict(analyzer.word_freq),
+        {word: dict(c) for word, c in analyzer.word_contributors.items()},
+        {word: sorted(ids) for word, ids in analyzer.word_sample_ids.items()},
+    )
+
+
+def check_repeated_words(workers, seed, k=5):
+    """每条消息把同一个词重复多次：样本应为 k 条不同的消息，且单进程与多进程一致"""
+    texts = ['好的好的好的', '哈哈哈哈 哈哈哈哈', '收到收到'] * 20
+    items = [(text, 'u', [], None) for text in texts]
+
+    sampler = ReservoirSampler(k, sample_salt(seed))
+    for idx, text in enumerate(texts):
+        for word in iter_count_tokens(list(jieba.cut(text)), []):
+            sampler.add(word, idx)
+    serial = {word: sorted(ids) for word, ids in sampler.samples.items()}
+    _, _, parallel = count_tokens_parallel(items, [], workers, k, seed)
+    parallel = {word: sorted(ids) for word, ids in parallel.items()}
+
+    distinct = all(len(ids) == len(set(ids)) == k for ids in serial.values())
+    return distinct and serial == parallel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分词统计基准测试")
+    parser.add_argument('json_path', nargs='?', help="聊天记录 JSON（可选）")
+    parser.add_argument('--workers', type=int, default=4, help="多进程分词的进程数")
+    parser.add_argument('--seed', default='benchmark', help="热词抽样种子")
+    args = parser.parse_args()
+
+    cfg.SAMPLE_SEED = args.seed
+    analyzer = ChatAnalyzer(build_chat(args.json_path))
+
+    # 分词前的阶段只跑一次，两种分词方式使用相同的词典和分词缓存
+    with contextlib.redirect_stdout(None):
+        analyzer._preprocess_texts()
+        analyzer.single_char_stats = analyze_single_chars(analyzer.cleaned_texts)
+        analyzer._discover_new_words()
+        analyzer._merge_word_pairs()
+    print(f"📝 语料: {len(analyzer.cleaned_texts)} 条有效文本")
+    print("=" * 60)
+
+    cfg.TOKENIZE_WORKERS = 0
+    start = time.perf_counter()
+    analyzer._tokenize_and_count()
+    serial_time = time.perf_counter() - start
+    serial = snapshot(analyzer)
+
+    analyzer.word_freq = Counter()
+    analyzer.word_contributors = defaultdict(Counter)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(None):
+        analyzer._tokenize_and_count_parallel(args.workers)
+    parallel_time = time.perf_counter() - start
+    parallel = snapshot(analyzer)
+
+    all_equal = True
+    for name, a, b in zip(['word_freq', 'word_contributors', 'word_sample_ids'], serial, parallel):
+        equal = a == b
+        all_equal = all_equal and equal
+        print(f"  {name:<18} {'✅ 一致' if equal else '❌ 不一致'}")
+    equal = check_repeated_words(args.workers, args.seed)
+    all_equal = all_equal and equal
+    print(f"  {'repeated_word_ids':<18} {'✅ 一致' if equal else '❌ 不一致'}")
+    speedup = serial_time / parallel_time if parallel_time > 0 else float('inf')
+    print(f"  单进程 {serial_time:>7.3f}s  {args.workers} 进程 {parallel_time:>7.3f}s  x{speedup:>5.1f}")
+
+    print("=" * 60)
+    if not all_equal:
+        print("❌ 存在不一致的结果")
+        sys.exit(1)
+    print("✅ 单进程与多进程结果一致")
+
+
+if __name__ == '__main__':
+    main()
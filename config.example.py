@@ -20,6 +20,11 @@ OUTPUT_ENCODING = "utf-8"
 # 控制台输出宽度
 CONSOLE_WIDTH = 60
 
+# 流式读取输入文件
+# True：逐条读取 messages，内存占用不随文件大小增长（推荐大文件使用）
+# False：一次性 json.load 整个文件
+STREAM_JSON_INPUT = True
+
 
 # ============================================
 # 词频统计参数
@@ -37,6 +42,11 @@ MIN_FREQ = 1
 MIN_WORD_LEN = 1    # 最小词长（字符数）
 MAX_WORD_LEN = 10   # 最大词长（字符数）
 
+# 分词统计使用的进程数
+# 0 或 1：单进程（默认）
+# 大于 1：多进程并行分词，适合消息量很大的群，结果与单进程一致
+TOKENIZE_WORKERS = 0
+
 
 # ============================================
 # 新词发现参数
@@ -57,6 +67,14 @@ ENTROPY_THRESHOLD = 0.5
 # 推荐值：10-30
 NEW_WORD_MIN_FREQ = 20
 
+# 新词发现实现
+# 'auto'   - 安装了 numpy 时使用 numpy，否则使用 python（默认）
+# 'numpy'  - 字符编码为整数数组批量计数，速度快、内存占用低
+# 'suffix_array' - 基于后缀数组枚举高频子串，内存与语料长度线性相关，适合多年合并的超大记录
+# 'python' - 纯 Python 字典计数，无额外依赖
+# 各实现在相同阈值下得到的新词完全一致
+NEW_WORD_BACKEND = 'auto'
+
 
 # ============================================
 # 词组合并参数
@@ -133,6 +151,9 @@ CONTRIBUTOR_TOP_N = 10
 # 每个热词显示的示例消息数量
 SAMPLE_COUNT = 10
 
+# 热词样本抽样的随机种子（None 为每次随机；设为整数可复现样本）
+SAMPLE_SEED = None
+
 
 # ============================================
 # 时间分析配置
@@ -179,6 +200,31 @@ OPENAI_MODEL = ""
 # 'ask'     - 每次询问用户（默认）
 AI_COMMENT_MODE = 'ask'
 
+# AI 锐评批量生成方式
+# 'concurrent'    - 每个词单独请求，并发执行（默认）
+# 'single_prompt' - 一次请求生成全部锐评（失败时改为逐词请求）
+AI_COMMENT_BATCH_MODE = 'concurrent'
+
+# 逐词请求时的最大并发数
+AI_COMMENT_CONCURRENCY = 5
+
+# 单次 AI 请求超时（秒）和失败重试次数（指数退避）
+AI_COMMENT_TIMEOUT = 30
+AI_COMMENT_RETRIES = 2
+
+# AI 结果缓存：相同词和样本的锐评、相同候选词的选词结果直接复用，不再请求模型
+AI_CACHE_ENABLED = True
+AI_CACHE_PATH = ''          # 留空使用 runtime_outputs/ai_cache.sqlite3
+AI_CACHE_TTL_DAYS = 30
+AI_CACHE_MAX_ENTRIES = 20000
+
+# AI 请求的 HTTP 连接池（进程内共享，保持 keep-alive）
+AI_HTTP_MAX_CONNECTIONS = 20      # 最大连接数，应不小于 AI_COMMENT_CONCURRENCY
+AI_HTTP_MAX_KEEPALIVE = 10        # 保持空闲的连接数
+AI_HTTP_KEEPALIVE_EXPIRY = 60     # 空闲连接保留时间（秒）
+AI_HTTP_CONNECT_TIMEOUT = 10      # 建立连接超时（秒）
+AI_HTTP_TIMEOUT = 120             # 默认读写超时（秒），锐评请求使用 AI_COMMENT_TIMEOUT
+
 
 # ============================================
 # 图片导出配置
@@ -195,6 +241,25 @@ ENABLE_IMAGE_EXPORT = True
 # 'ask'     - 每次询问用户（默认）
 IMAGE_GENERATION_MODE = 'ask'
 
+# 截图服务：常驻一个无头浏览器，页面复用
+RENDER_POOL_SIZE = 2        # 页面池大小，即同时渲染的报告数
+RENDER_DEVICE_SCALE = 3     # 截图分辨率倍数
+RENDER_TIMEOUT = 30         # 等待页面加载和渲染完成的超时（秒）
+
+# 离线渲染：生成完全自包含的 HTML，渲染不访问外部网络
+# True：内嵌本地字体（按报告用到的字符子集化，需要 pip install fonttools）和本地缓存的头像
+# False：使用 Google Fonts 和 QQ 头像链接（默认）
+OFFLINE_RENDER = False
+OFFLINE_FONT_PATH = ''          # 本地字体文件（.ttf/.otf），如 NotoSansSC-Regular.otf；留空使用系统字体
+AVATAR_CACHE_DIR = ''           # 头像缓存目录，留空使用 runtime_outputs/avatars
+OFFLINE_FETCH_AVATARS = False   # 缓存中没有的头像是否联网下载（失败的一天内不再重试）；默认直接使用占位图
+
+# 报告模板
+# 编译后的模板在进程内复用，字节码缓存到 runtime_outputs/template_cache 供其他进程复用
+TEMPLATE_BYTECODE_CACHE = True
+# 调试模板时设为 True：模板文件修改后自动重新加载
+TEMPLATE_DEBUG = False
+
 
 # ============================================
 # 高级配置（一般不需要修改）
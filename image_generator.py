@@ -4,10 +4,14 @@ import os
 import sys
 import json
 import math
-import asyncio
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+import threading
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, TemplateNotFound, select_autoescape
 import config as cfg
 from utils import sanitize_filename
+from ai_cache import get_ai_cache, make_key, freq_bucket, samples_digest
+from ai_client import get_openai_client, get_api_settings
+from render_service import get_render_service, is_playwright_available
+from offline_assets import get_avatar_cache, inline_fonts
 
 
 # 每个词独立的贡献者颜色
@@ -16,6 +20,13 @@ WORD_COLORS = [
     '#16A34A', '#0D9488', '#0891B2', '#2563EB', '#7C3AED'
 ]
 
+# AI 请求重试的基础退避时间（秒），第 n 次重试等待约 base * 2^n
+AI_RETRY_BACKOFF = 1.0
+
+# 提示词版本，修改选词/锐评提示词后递增，使旧的 AI 缓存失效
+SELECT_PROMPT_VERSION = 1
+COMMENT_PROMPT_VERSION = 1
+
 # 榜单配置 (title, key, icon, unit)
 RANKING_CONFIG = [
     ('群聊噪音', '话痨榜', '🏆', '条'),
@@ -58,6 +69,45 @@ def get_avatar_url(uin):
     return f"https://q1.qlogo.cn/g?b=qq&nk={uin}&s=640"
 
 
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+REPORT_TEMPLATE = 'report_template.html'
+
+_template_env = None
+_template_env_lock = threading.Lock()
+
+
+def get_template_env():
+    """
+    进程内共享的 Jinja2 环境，首次使用时创建
+    编译后的模板缓存在内存中，字节码缓存到磁盘供其他进程复用；
+    TEMPLATE_DEBUG = True 时模板文件修改后自动重新加载
+    """
+    global _template_env
+    with _template_env_lock:
+        if _template_env is None:
+            bytecode_cache = None
+            if getattr(cfg, 'TEMPLATE_BYTECODE_CACHE', True):
+                cache_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                         'runtime_outputs', 'template_cache')
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(cache_dir)
+                except OSError as e:
+                    print(f"⚠️ 模板字节码缓存不可用: {e}")
+            
+            env = Environment(
+                loader=FileSystemLoader(TEMPLATE_DIR),
+                autoescape=select_autoescape(['html']),
+                auto_reload=getattr(cfg, 'TEMPLATE_DEBUG', False),
+                bytecode_cache=bytecode_cache
+            )
+            env.filters['format_number'] = format_number
+            env.filters['truncate_text'] = truncate_text
+            env.filters['avatar_url'] = get_avatar_url
+            _template_env = env
+        return _template_env
+
+
 def clean_ai_response(text):
     # 清理AI响应中的思考过程标记
     if not text:
@@ -116,27 +166,17 @@ class AIWordSelector:
         self._init_client()
     
     def _init_client(self):
-        """初始化OpenAI客户端"""
-        # 支持从环境变量读取API密钥
-        api_key = os.getenv('OPENAI_API_KEY', cfg.OPENAI_API_KEY)
-        base_url = os.getenv('OPENAI_BASE_URL', cfg.OPENAI_BASE_URL)
-        model = os.getenv('OPENAI_MODEL', cfg.OPENAI_MODEL)
-        
-        if not api_key or api_key == "sk-your-api-key-here":
-            print("⚠️ 未配置OpenAI API Key，无法使用AI选词")
-            return
-        
+        """获取共享的OpenAI客户端（选词请求保留2次自动重试）"""
         try:
-            from openai import OpenAI
-            import httpx
-            
-            self.client = OpenAI(
-                api_key=api_key,
-                base_url=base_url,
-                http_client=httpx.Client(timeout=120.0)
-            )
+            client = get_openai_client()
         except Exception as e:
             print(f"⚠️ OpenAI客户端初始化失败: {e}")
+            return
+        
+        if client is None:
+            print("⚠️ 未配置OpenAI API Key，无法使用AI选词")
+            return
+        self.client = client.with_options(max_retries=2)
     
     def select_words(self, candidate_words, top_n=200):
         """从候选词中智能选出10个年度热词"""
@@ -172,27 +212,41 @@ class AIWordSelector:
 6. 尽量选择前100的，除非后面有特别有趣的词
 7. 尽量不要选择“啊”等无意义填充词，除非在例句中使用的特别有趣"""
 
+        # 缓存键：模型 + 提示词版本 + 候选词（词、词频档位、样本预览）
+        model = get_api_settings()[2]
+        cache = get_ai_cache()
+        cache_key = make_key(
+            'select', model, SELECT_PROMPT_VERSION,
+            [(w['word'], freq_bucket(w['freq']), (w.get('samples') or [''])[0][:30]) for w in candidates]
+        )
+        
         try:
-            print("🤖 AI正在分析并选择年度热词...")
-            response = self.client.chat.completions.create(
-                model=cfg.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=100,
-                temperature=0.7
-            )
-            
-            # 清理响应中的思考过程
-            raw_result = response.choices[0].message.content.strip()
-            result = clean_ai_response(raw_result)
-            
-            # 如果清理后为空，使用原始结果
-            if not result:
-                result = raw_result
-            
-            print(f"   AI返回: {result}")
+            result = cache.get(cache_key) if cache else None
+            if result:
+                print(f"♻️ 使用缓存的AI选词结果: {result}")
+            else:
+                print("🤖 AI正在分析并选择年度热词...")
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role": "system", "content": self.SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    max_tokens=100,
+                    temperature=0.7
+                )
+                
+                # 清理响应中的思考过程
+                raw_result = response.choices[0].message.content.strip()
+                result = clean_ai_response(raw_result)
+                
+                # 如果清理后为空，使用原始结果
+                if not result:
+                    result = raw_result
+                
+                print(f"   AI返回: {result}")
+                if cache:
+                    cache.set(cache_key, result, kind='select')
             
             # 解析序号
             indices = []
@@ -247,43 +301,76 @@ class AICommentGenerator:
     def __init__(self):
         self.client = None
         self.model = None
+        self.concurrency = max(1, getattr(cfg, 'AI_COMMENT_CONCURRENCY', 5))
+        self.timeout = getattr(cfg, 'AI_COMMENT_TIMEOUT', 30)
+        self.retries = max(0, getattr(cfg, 'AI_COMMENT_RETRIES', 2))
+        self.batch_mode = getattr(cfg, 'AI_COMMENT_BATCH_MODE', 'concurrent')
         self._init_client()
     
     def _init_client(self):
-        """初始化OpenAI客户端"""
-        # 支持从环境变量读取API密钥
-        api_key = os.getenv('OPENAI_API_KEY', cfg.OPENAI_API_KEY)
-        base_url = os.getenv('OPENAI_BASE_URL', cfg.OPENAI_BASE_URL)
-        self.model = os.getenv('OPENAI_MODEL', cfg.OPENAI_MODEL) or 'deepseek-chat'
-        
-        if not api_key or api_key == "sk-your-api-key-here":
-            print("⚠️ 未配置OpenAI API Key，将跳过AI锐评")
-            return
+        """获取共享的OpenAI客户端（重试由 _create_with_retry 控制）"""
+        self.model = get_api_settings()[2] or 'deepseek-chat'
         
         try:
-            from openai import OpenAI
-            import httpx
-            
-            self.client = OpenAI(
-                api_key=api_key,
-                base_url=base_url,
-                http_client=httpx.Client(timeout=60.0)  # 增加超时
-            )
-            
-            print(f"✅ AI客户端初始化成功，模型: {self.model}")
-            
-            # 调试信息
-            if os.environ.get('HTTPS_PROXY') or os.environ.get('https_proxy'):
-                print("🌐 系统代理已自动加载")
-                
+            self.client = get_openai_client()
         except Exception as e:
             print(f"⚠️ OpenAI客户端初始化失败: {e}")
+            return
+        
+        if self.client is None:
+            print("⚠️ 未配置OpenAI API Key，将跳过AI锐评")
+            return
+        print(f"✅ AI客户端已就绪，模型: {self.model}")
+    
+    @staticmethod
+    def _is_retryable(error):
+        """超时、连接错误、限流和服务端错误可以重试，鉴权/参数错误不重试"""
+        status = getattr(error, 'status_code', None)
+        return status is None or status in (408, 409, 429) or status >= 500
+    
+    def _create_with_retry(self, **kwargs):
+        """调用 chat.completions.create（单次请求超时 self.timeout 秒），失败按指数退避重试"""
+        import time
+        import random
+        
+        for attempt in range(self.retries + 1):
+            try:
+                return self.client.chat.completions.create(
+                    model=self.model,
+                    timeout=self.timeout,
+                    **kwargs
+                )
+            except Exception as e:
+                if attempt >= self.retries or not self._is_retryable(e):
+                    raise
+                time.sleep(AI_RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, AI_RETRY_BACKOFF))
+    
+    def _comment_cache_key(self, word, freq, samples):
+        """锐评缓存键：模型 + 提示词版本 + 词 + 词频档位 + 提示中用到的样本"""
+        return make_key('comment', self.model, COMMENT_PROMPT_VERSION, word,
+                        freq_bucket(freq), samples_digest(s[:50] for s in samples[:5]))
+    
+    def _cached_comment(self, word, freq, samples):
+        cache = get_ai_cache()
+        return cache.get(self._comment_cache_key(word, freq, samples)) if cache else None
+    
+    def _store_comment(self, word, freq, samples, comment):
+        cache = get_ai_cache()
+        if cache:
+            cache.set(self._comment_cache_key(word, freq, samples), comment, kind='comment')
     
     def generate_comment(self, word, freq, samples):
-        """为单个词生成锐评"""
+        """为单个词生成锐评（优先使用缓存）"""
         if not self.client:
             return self._fallback_comment(word)
         
+        cached = self._cached_comment(word, freq, samples)
+        if cached:
+            return cached
+        return self._request_comment(word, freq, samples)
+    
+    def _request_comment(self, word, freq, samples):
+        """请求模型为单个词生成锐评，成功的结果写入缓存，失败返回备用锐评"""
         # 构建用户提示
         samples_text = '\n'.join(f'- {s[:50]}' for s in samples[:5]) if samples else '无'
         
@@ -297,8 +384,7 @@ class AICommentGenerator:
 直接输出锐评内容，不要加引号或其他格式。"""
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            response = self._create_with_retry(
                 messages=[
                     {"role": "system", "content": self.SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
@@ -315,11 +401,57 @@ class AICommentGenerator:
             if not cleaned_content or len(cleaned_content) < 5:
                 return self._fallback_comment(word)
             
+            self._store_comment(word, freq, samples, cleaned_content)
             return cleaned_content
         except Exception as e:
             print(f"   ⚠️ AI生成失败({word}): {e}")
             return self._fallback_comment(word)
     
+    def _generate_single_prompt(self, words_data):
+        """一次请求为所有词生成锐评（要求返回 JSON 对象），请求或解析失败返回 None"""
+        blocks = []
+        for i, word_info in enumerate(words_data, 1):
+            samples = word_info.get('samples', [])
+            samples_text = '；'.join(s[:50].replace('\n', ' ') for s in samples[:3]) if samples else '无'
+            blocks.append(f"{i}. 词语：{word_info['word']}（{word_info['freq']}次）样本：{samples_text}")
+        
+        user_prompt = f"""请为以下{len(words_data)}个群聊热词各生成一句锐评：
+
+{chr(10).join(blocks)}
+
+以 JSON 对象输出，键为词语原文，值为对应的锐评，例如 {{"词语1": "锐评1", "词语2": "锐评2"}}。
+只输出 JSON，不要加其他文字。"""
+
+        try:
+            response = self._create_with_retry(
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=80 * len(words_data) + 100,
+                temperature=0.9
+            )
+            content = clean_ai_response(response.choices[0].message.content.strip())
+            start, end = content.find('{'), content.rfind('}')
+            parsed = json.loads(content[start:end + 1]) if start >= 0 and end > start else None
+            if not isinstance(parsed, dict):
+                raise ValueError("返回内容不是 JSON 对象")
+        except Exception as e:
+            print(f"   ⚠️ AI批量生成失败: {e}")
+            return None
+        
+        comments = {}
+        for word_info in words_data:
+            word = word_info['word']
+            comment = parsed.get(word)
+            if isinstance(comment, str) and len(comment.strip()) >= 5:
+                comments[word] = comment.strip()
+                self._store_comment(word, word_info['freq'], word_info.get('samples', []), comments[word])
+            else:
+                print(f"   ⚠️ AI未返回({word})的锐评，使用默认锐评")
+                comments[word] = self._fallback_comment(word)
+        return comments
+    
     def _fallback_comment(self, word):
         """备用锐评"""
         fallbacks = [
@@ -333,25 +465,55 @@ class AICommentGenerator:
         return random.choice(fallbacks)
     
     def generate_batch(self, words_data):
-        """批量生成锐评"""
+        """
+        批量生成锐评
+        AI_COMMENT_BATCH_MODE = 'single_prompt' 时一次请求生成全部，失败再逐词生成；
+        否则逐词请求，最多 AI_COMMENT_CONCURRENCY 个并发
+        """
         if not self.client:
             print("⚠️ AI未启用，使用默认锐评")
             return {w['word']: self._fallback_comment(w['word']) for w in words_data}
+        if not words_data:
+            return {}
         
-        print("🤖 正在生成AI锐评...")
+        # 先查缓存，只为未命中的词请求模型
         comments = {}
-        for i, word_info in enumerate(words_data, 1):
-            word = word_info['word']
-            print(f"   [{i}/{len(words_data)}] {word}...", end=' ')
-            comment = self.generate_comment(
-                word, 
-                word_info['freq'], 
-                word_info.get('samples', [])
-            )
-            comments[word] = comment
-            print(f"✓")
-        
-        return comments
+        pending = []
+        for w in words_data:
+            cached = self._cached_comment(w['word'], w['freq'], w.get('samples', []))
+            if cached:
+                comments[w['word']] = cached
+            else:
+                pending.append(w)
+        if comments:
+            print(f"♻️ {len(comments)} 个词使用缓存的AI锐评")
+        
+        if pending and self.batch_mode == 'single_prompt':
+            print(f"🤖 正在生成AI锐评（单次请求 {len(pending)} 个词）...")
+            generated = self._generate_single_prompt(pending)
+            if generated is not None:
+                comments.update(generated)
+                pending = []
+            else:
+                print("   改为逐词生成...")
+        
+        if pending:
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+            
+            workers = min(self.concurrency, len(pending))
+            print(f"🤖 正在生成AI锐评（并发 {workers}）...")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(self._request_comment, w['word'], w['freq'], w.get('samples', [])): w['word']
+                    for w in pending
+                }
+                for i, future in enumerate(as_completed(futures), 1):
+                    word = futures[future]
+                    comments[word] = future.result()
+                    print(f"   [{i}/{len(pending)}] {word} ✓")
+        
+        # 按输入顺序返回
+        return {w['word']: comments[w['word']] for w in words_data}
 
 
 class ImageGenerator:
@@ -363,7 +525,7 @@ class ImageGenerator:
         self.selected_words = []
         self.ai_comments = {}
         self.output_dir = output_dir or os.path.dirname(os.path.abspath(cfg.INPUT_FILE))
-        self.template_dir = os.path.join(os.path.dirname(__file__), 'templates')
+        self.template_dir = TEMPLATE_DIR
         
         if json_path and os.path.exists(json_path):
             with open(json_path, 'r', encoding='utf-8') as f:
@@ -373,6 +535,23 @@ class ImageGenerator:
         
         self.enabled = cfg.ENABLE_IMAGE_EXPORT
         self.ai_selector = None
+        # 离线模式：内嵌字体和头像，生成不依赖外部网络的 HTML
+        self.offline = getattr(cfg, 'OFFLINE_RENDER', False)
+    
+    def _inline_avatars(self, data):
+        """
+        离线模式：把榜单头像换成本地缓存的 data URI
+        只用于生成HTML，_prepare_template_data 的结果（前端数据）仍为头像链接
+        """
+        cache = get_avatar_cache()
+        rankings = []
+        for ranking in data['rankings']:
+            ranking = dict(ranking)
+            if ranking['first']:
+                ranking['first'] = dict(ranking['first'], avatar=cache.resolve(ranking['first']['uin']))
+            ranking['others'] = [dict(item, avatar=cache.resolve(item['uin'])) for item in ranking['others']]
+            rankings.append(ranking)
+        return dict(data, rankings=rankings)
     
     def display_words_for_selection(self):
         """展示词汇供用户选择"""
@@ -646,75 +825,57 @@ class ImageGenerator:
             self.ai_comments = {w['word']: ai_gen._fallback_comment(w['word']) 
                               for w in self.selected_words}
     
-    def generate_html(self):
-        """生成HTML"""
+    def iter_html(self, template=None):
+        """
+        逐块生成报告HTML，可直接写入文件或作为流式响应返回
+        离线模式需要完整页面来计算字体子集，一次性生成
+        """
+        template = template or get_template_env().get_template(REPORT_TEMPLATE)
+        data = self._prepare_template_data()
+        if self.offline:
+            yield inline_fonts(template.render(**self._inline_avatars(data)))
+        else:
+            yield from template.generate(**data)
+    
+    def render_to_stream(self, fp, template=None):
+        """将报告HTML逐块写入文件对象"""
+        for chunk in self.iter_html(template):
+            fp.write(chunk)
+    
+    def generate_html(self, html_path=None):
+        """生成HTML，html_path 为空时写入 output_dir 下以群名命名的文件"""
         if not self.selected_words:
             print("❌ 未选择热词")
             return None
         
-        if not os.path.exists(self.template_dir):
-            os.makedirs(self.template_dir)
-        
-        template_path = os.path.join(self.template_dir, 'report_template.html')
-        if not os.path.exists(template_path):
-            print(f"❌ 模板不存在: {template_path}")
+        try:
+            template = get_template_env().get_template(REPORT_TEMPLATE)
+        except TemplateNotFound:
+            print(f"❌ 模板不存在: {os.path.join(self.template_dir, REPORT_TEMPLATE)}")
             return None
         
-        env = Environment(
-            loader=FileSystemLoader(self.template_dir),
-            autoescape=select_autoescape(['html'])
-        )
-        env.filters['format_number'] = format_number
-        env.filters['truncate_text'] = truncate_text
-        env.filters['avatar_url'] = get_avatar_url
-        
-        template = env.get_template('report_template.html')
-        data = self._prepare_template_data()
-        html_content = template.render(**data)
-        
-        safe_name = sanitize_filename(self.json_data.get('chatName', '未知'))
-        html_path = os.path.join(self.output_dir, f"{safe_name}_年度热词报告.html")
+        if not html_path:
+            safe_name = sanitize_filename(self.json_data.get('chatName', '未知'))
+            html_path = os.path.join(self.output_dir, f"{safe_name}_年度热词报告.html")
         
         with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+            self.render_to_stream(f, template)
         
         print(f"✅ HTML: {html_path}")
         return html_path
     
-    async def _html_to_image_async(self, html_path, output_path):
-        """异步转图片 - 高分辨率"""
-        try:
-            from playwright.async_api import async_playwright
-        except ImportError:
+    def html_to_image(self, html_path):
+        """转图片（使用常驻浏览器的截图服务）"""
+        if not is_playwright_available():
             print("❌ 需要: pip install playwright && playwright install chromium")
             return None
         
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            # 使用 device_scale_factor=3 提高分辨率（3倍）
-            page = await browser.new_page(
-                viewport={'width': 450, 'height': 800},
-                device_scale_factor=3  # 高清截图
-            )
-            await page.goto(f'file://{os.path.abspath(html_path)}')
-            await page.wait_for_timeout(2000)
-            height = await page.evaluate('document.body.scrollHeight')
-            await page.set_viewport_size({'width': 450, 'height': height + 50})
-            await page.wait_for_timeout(500)
-            await page.screenshot(path=output_path, full_page=True)
-            await browser.close()
-        
-        return output_path
-
-    
-    def html_to_image(self, html_path):
-        """转图片"""
         safe_name = sanitize_filename(self.json_data.get('chatName', '未知'))
         output_path = os.path.join(self.output_dir, f"{safe_name}_年度热词报告.png")
         
         print("🖼️ 转换为图片...")
         try:
-            result = asyncio.run(self._html_to_image_async(html_path, output_path))
+            result = get_render_service().render(html_path, output_path)
             if result:
                 print(f"✅ 图片: {output_path}")
                 return output_path
@@ -21,7 +21,7 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import config as cfg
-from utils import load_json, sanitize_filename
+from utils import load_json, load_json_stream, sanitize_filename
 from analyzer import ChatAnalyzer
 from report_generator import ReportGenerator
 from image_generator import ImageGenerator
@@ -45,7 +45,10 @@ def main():
     
     # 加载数据
     try:
-        data = load_json(input_file)
+        if getattr(cfg, 'STREAM_JSON_INPUT', True):
+            data = load_json_stream(input_file)
+        else:
+            data = load_json(input_file)
     except Exception as e:
         print(f"❌ 文件加载失败: {e}")
         sys.exit(1)
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+离线渲染资源
+
+OFFLINE_RENDER = True 时生成完全自包含的报告 HTML：
+- 字体：本地字体文件按报告实际用到的字符做子集化（需要 fonttools，未安装时内嵌完整字体），
+  以 base64 @font-face 内嵌，替换 Google Fonts 的 @import
+- 头像：从本地磁盘缓存读取并内嵌为 data URI；缓存中没有时使用占位图，或按配置下载
+  （下载失败会记录下来，一段时间内不再重试）
+渲染不再依赖外部网络，截图耗时稳定
+"""
+
+import os
+import re
+import base64
+import time
+import hashlib
+import threading
+import urllib.request
+import config as cfg
+
+
+DEFAULT_AVATAR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  'runtime_outputs', 'avatars')
+
+GOOGLE_FONTS_IMPORT = re.compile(r"@import url\(['\"]?https://fonts\.googleapis\.com/[^)]*\);?")
+HTML_TAG = re.compile(r'<(script|style)\b.*?</\1>|<[^>]+>', re.S)
+STYLE_BLOCK = re.compile(r'<style\b[^>]*>(.*?)</style>', re.S | re.I)
+# CSS 伪元素中的字符（如 content: '★'），不在页面文本里，需要单独加入子集
+CSS_CONTENT = re.compile(r'\bcontent\s*:\s*([\'"])(.*?)\1', re.S)
+CSS_ESCAPE = re.compile(r'\\([0-9a-fA-F]{1,6})\s?')
+
+# 灰色圆形占位头像
+PLACEHOLDER_AVATAR = 'data:image/svg+xml;base64,' + base64.b64encode(
+    b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 64 64">'
+    b'<rect width="64" height="64" fill="#3a3a3a"/>'
+    b'<circle cx="32" cy="24" r="12" fill="#777"/>'
+    b'<path d="M10 60c0-14 10-22 22-22s22 8 22 22z" fill="#777"/></svg>'
+).decode('ascii')
+
+
+def _data_uri(data, mime):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def _image_mime(data):
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return 'image/png'
+    if data[:4] == b'GIF8':
+        return 'image/gif'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+class AvatarCache:
+    """QQ 头像的本地磁盘缓存，返回可直接用作 img src 的 data URI"""
+
+    def __init__(self, cache_dir, fetch=False, timeout=3, retry_after=86400):
+        self.cache_dir = cache_dir
+        self.fetch = fetch
+        self.timeout = timeout
+        self.retry_after = retry_after
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, uin):
+        return os.path.join(self.cache_dir, f"{uin}.img")
+
+    def _miss_path(self, uin):
+        """下载失败标记，retry_after 秒内不再重试该头像"""
+        return os.path.join(self.cache_dir, f"{uin}.miss")
+
+    def _recently_failed(self, uin):
+        try:
+            return os.path.getmtime(self._miss_path(uin)) + self.retry_after > time.time()
+        except OSError:
+            return False
+
+    def _mark_failed(self, uin):
+        try:
+            with open(self._miss_path(uin), 'wb'):
+                pass
+        except OSError:
+            pass
+
+    def _download(self, uin):
+        url = f"https://q1.qlogo.cn/g?b=qq&nk={uin}&s=640"
+        with urllib.request.urlopen(url, timeout=self.timeout) as resp:
+            data = resp.read()
+        path = self._path(uin)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+    def resolve(self, uin):
+        uin = str(uin or '')
+        if not uin.isdigit():
+            return PLACEHOLDER_AVATAR
+        try:
+            with open(self._path(uin), 'rb') as f:
+                data = f.read()
+        except OSError:
+            if not self.fetch or self._recently_failed(uin):
+                return PLACEHOLDER_AVATAR
+            try:
+                data = self._download(uin)
+            except Exception as e:
+                print(f"⚠️ 头像下载失败 {uin}: {e}")
+                self._mark_failed(uin)
+                return PLACEHOLDER_AVATAR
+        return _data_uri(data, _image_mime(data)) if data else PLACEHOLDER_AVATAR
+
+
+def _font_format(data):
+    return ('font/otf', 'opentype') if data[:4] == b'OTTO' else ('font/ttf', 'truetype')
+
+
+def subset_font(font_path, text):
+    """返回只包含 text 中字符的字体数据；未安装 fonttools 时返回完整字体"""
+    try:
+        from fontTools import subset
+    except ImportError:
+        print("⚠️ 未安装 fonttools，内嵌完整字体（pip install fonttools 可大幅减小体积）")
+        with open(font_path, 'rb') as f:
+            return f.read()
+
+    import io
+    import logging
+    logging.getLogger('fontTools').setLevel(logging.ERROR)
+    options = subset.Options()
+    options.layout_features = ['*']
+    options.name_IDs = ['*']
+    options.notdef_outline = True
+    font = subset.load_font(font_path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    subset.save_font(font, buf, options)
+    return buf.getvalue()
+
+
+_font_cache = {}
+_font_lock = threading.Lock()
+
+
+def font_face_css(font_path, text, family='Noto Sans SC'):
+    """生成内嵌子集字体的 @font-face，同一字体和字符集的结果在进程内复用"""
+    chars = ''.join(sorted(set(text)))
+    key = (font_path, os.path.getmtime(font_path), hashlib.sha1(chars.encode('utf-8')).hexdigest())
+    with _font_lock:
+        css = _font_cache.get(key)
+    if css is None:
+        data = subset_font(font_path, chars)
+        mime, fmt = _font_format(data)
+        css = (f"@font-face {{ font-family: '{family}'; font-weight: 100 900; font-style: normal; "
+               f"src: url({_data_uri(data, mime)}) format('{fmt}'); }}")
+        with _font_lock:
+            _font_cache.clear()  # 只保留最近一份，避免长期运行时占用内存
+            _font_cache[key] = css
+    return css
+
+
+def css_content_text(html):
+    """提取 <style> 中 content 属性的字符串（解码 \\2605 这类转义）"""
+    return ''.join(
+        CSS_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), match.group(2))
+        for block in STYLE_BLOCK.findall(html)
+        for match in CSS_CONTENT.finditer(block)
+    )
+
+
+def inline_fonts(html, font_path=None):
+    """
+    替换模板中的 Google Fonts 引用：配置了本地字体时内嵌子集字体，
+    否则直接去掉外部引用，使用系统字体
+    """
+    font_path = font_path if font_path is not None else getattr(cfg, 'OFFLINE_FONT_PATH', '')
+    replacement = ''
+    if font_path:
+        if os.path.exists(font_path):
+            # 子集包含页面文本、CSS content 中的装饰字符和全部可见 ASCII 字符
+            text = (HTML_TAG.sub('', html) + css_content_text(html)
+                    + ''.join(chr(c) for c in range(0x20, 0x7f)))
+            replacement = font_face_css(font_path, text)
+        else:
+            print(f"⚠️ 离线字体不存在: {font_path}，使用系统字体")
+    return GOOGLE_FONTS_IMPORT.sub(lambda _: replacement, html)
+
+
+_avatar_cache = None
+_avatar_lock = threading.Lock()
+
+
+def get_avatar_cache():
+    """进程内共享的头像缓存"""
+    global _avatar_cache
+    with _avatar_lock:
+        if _avatar_cache is None:
+            _avatar_cache = AvatarCache(
+                getattr(cfg, 'AVATAR_CACHE_DIR', '') or DEFAULT_AVATAR_DIR,
+                fetch=getattr(cfg, 'OFFLINE_FETCH_AVATARS', False),
+            )
+        return _avatar_cache
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+趣味榜单计算
+
+每个榜单只取前 N 名，用有界堆（heapq.nlargest）选取，不对全部成员排序；
+结果缓存在分析器上，控制台报告、文件报告和 JSON 导出共用同一份。
+"""
+
+import heapq
+from operator import itemgetter
+
+
+def format_char_per_msg(avg):
+    return f"{avg:.1f}字/条"
+
+
+# (榜单名, ChatAnalyzer 上的统计属性, 数值格式化函数)，顺序即输出顺序
+RANKING_SPECS = [
+    ('话痨榜', 'user_msg_count', None),
+    ('字数榜', 'user_char_count', None),
+    ('长文王', 'user_char_per_msg', format_char_per_msg),
+    ('图片狂魔', 'user_image_count', None),
+    ('合并转发王', 'user_forward_count', None),
+    ('回复狂', 'user_reply_count', None),
+    ('被回复最多', 'user_replied_count', None),
+    ('艾特狂', 'user_at_count', None),
+    ('被艾特最多', 'user_ated_count', None),
+    ('表情帝', 'user_emoji_count', None),
+    ('链接分享王', 'user_link_count', None),
+    ('深夜党', 'user_night_count', None),
+    ('早起鸟', 'user_morning_count', None),
+    ('复读机', 'user_repeat_count', None),
+]
+
+
+def top_items(mapping, n):
+    """
+    取 mapping 中值最大的前 n 项
+    同值按插入顺序排列，结果与 Counter.most_common(n) 一致
+    """
+    return heapq.nlargest(n, mapping.items(), key=itemgetter(1))
+
+
+def compute_rankings(analyzer, top_n):
+    """计算全部榜单，返回 {榜单名: [(uin, 数值), ...]}"""
+    rankings = {}
+    for title, attr, formatter in RANKING_SPECS:
+        entries = top_items(getattr(analyzer, attr), top_n)
+        if formatter:
+            entries = [(uin, formatter(value)) for uin, value in entries]
+        rankings[title] = entries
+    return rankings
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+报告截图服务
+
+常驻一个无头 Chromium，并维护可复用的页面池，避免每张图片都重新启动浏览器。
+页面打开后等待模板设置的渲染完成标记（字体、图片加载完毕），不再使用固定延时。
+后台线程运行独立的事件循环，同步接口可在 CLI 和 Web 后端的任意线程中调用，
+同时渲染的数量由信号量限制为页面池大小
+"""
+
+import os
+import atexit
+import asyncio
+import threading
+import concurrent.futures
+import config as cfg
+
+
+VIEWPORT_WIDTH = 450
+INITIAL_HEIGHT = 800
+
+# 模板中的标记脚本带 data-render-marker 属性；没有标记脚本的旧 HTML 以页面加载完成为准
+READY_CHECK_JS = """() => window.__REPORT_RENDER_COMPLETE__ === true
+    || (!document.querySelector('script[data-render-marker]') && document.readyState === 'complete')"""
+FONTS_READY_JS = "() => document.fonts ? document.fonts.ready.then(() => true) : true"
+NEXT_FRAME_JS = "() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))"
+
+
+def is_playwright_available():
+    import importlib.util
+    return importlib.util.find_spec('playwright') is not None
+
+
+class RenderService:
+    def __init__(self, pool_size=2, scale=3, timeout=30):
+        self.pool_size = max(1, pool_size)
+        self.scale = scale
+        self.timeout = timeout
+        self.rendered = 0
+        self.failed = 0
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # 以下对象只在事件循环线程中访问
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None
+        self._semaphore = None
+        self._idle = []  # 空闲页面 (browser, context, page)
+
+    # ---------- 事件循环 ----------
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='render-service', daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def _run(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    # ---------- 浏览器与页面池 ----------
+
+    async def _get_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._idle.clear()
+                self._browser = await self._playwright.chromium.launch()
+                print("🌐 截图服务已启动浏览器")
+        return self._browser
+
+    async def _acquire_page(self):
+        browser = await self._get_browser()
+        while self._idle:
+            slot = self._idle.pop()
+            if slot[0] is browser and not slot[2].is_closed():
+                return slot
+        # 使用 device_scale_factor 提高分辨率
+        context = await browser.new_context(
+            viewport={'width': VIEWPORT_WIDTH, 'height': INITIAL_HEIGHT},
+            device_scale_factor=self.scale
+        )
+        page = await context.new_page()
+        return (browser, context, page)
+
+    async def _release_page(self, slot, healthy):
+        """正常完成的页面放回池中复用，出错的页面直接关闭"""
+        if healthy and slot[0] is self._browser:
+            self._idle.append(slot)
+            return
+        try:
+            await slot[1].close()
+        except Exception:
+            pass
+
+    # ---------- 渲染 ----------
+
+    async def _wait_ready(self, page):
+        """等待渲染完成标记和字体加载，超时仍继续截图"""
+        try:
+            await page.wait_for_function(READY_CHECK_JS, timeout=self.timeout * 1000)
+            await page.evaluate(FONTS_READY_JS)
+        except Exception as e:
+            if type(e).__name__ != 'TimeoutError':
+                raise
+            print(f"⚠️ 等待页面渲染完成超时（{self.timeout}秒），直接截图")
+
+    async def _render(self, html_path, output_path):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+        async with self._semaphore:
+            slot = await self._acquire_page()
+            page = slot[2]
+            healthy = False
+            try:
+                await page.set_viewport_size({'width': VIEWPORT_WIDTH, 'height': INITIAL_HEIGHT})
+                await page.goto(f'file://{os.path.abspath(html_path)}', timeout=self.timeout * 1000)
+                await self._wait_ready(page)
+                height = await page.evaluate('document.body.scrollHeight')
+                await page.set_viewport_size({'width': VIEWPORT_WIDTH, 'height': height + 50})
+                await page.evaluate(NEXT_FRAME_JS)
+                await page.screenshot(path=output_path, full_page=True)
+                healthy = True
+            finally:
+                await self._release_page(slot, healthy)
+        return output_path
+
+    def _count(self, ok):
+        with self._stats_lock:
+            if ok:
+                self.rendered += 1
+            else:
+                self.failed += 1
+
+    def render(self, html_path, output_path):
+        """将 HTML 文件截图为 PNG，返回输出路径；失败时抛出异常（未安装 playwright 时为 ImportError）"""
+        try:
+            result = self._run(self._render(html_path, output_path), timeout=self.timeout * 3)
+        except BaseException:
+            self._count(False)
+            raise
+        self._count(True)
+        return result
+
+    def render_many(self, jobs):
+        """
+        并发渲染多份报告，jobs 为 [(html_path, output_path), ...]
+        返回与 jobs 顺序一致的列表，失败项为异常对象
+        """
+        async def run_all():
+            return await asyncio.gather(
+                *(self._render(html_path, output_path) for html_path, output_path in jobs),
+                return_exceptions=True
+            )
+
+        results = self._run(run_all())
+        for result in results:
+            self._count(not isinstance(result, BaseException))
+        return results
+
+    # ---------- 生命周期 ----------
+
+    async def _close(self):
+        for _, context, _ in self._idle:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        """关闭浏览器并停止后台事件循环"""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(10)
+        except Exception as e:
+            print(f"⚠️ 关闭截图服务失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        if not thread.is_alive():
+            loop.close()
+        self._browser_lock = self._semaphore = None
+
+    def stats(self):
+        return {
+            "pool_size": self.pool_size,
+            "idle_pages": len(self._idle),
+            "browser_running": self._browser is not None,
+            "rendered": self.rendered,
+            "failed": self.failed
+        }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """进程内共享的截图服务，首次调用时创建，进程退出时关闭浏览器"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService(
+                pool_size=getattr(cfg, 'RENDER_POOL_SIZE', 2),
+                scale=getattr(cfg, 'RENDER_DEVICE_SCALE', 3),
+                timeout=getattr(cfg, 'RENDER_TIMEOUT', 30),
+            )
+            atexit.register(_service.close)
+        return _service
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+分词缓存：每条文本只完整分词一次
+
+jieba 按 log(词频/词典总频次) 选择切分路径。词典总频次不变时，加入新词只会改变
+包含该词的文本的切分结果，因此加入合并词组时保持总频次不变，只对包含新词的文本重新分词；
+总频次意外变化时（其他地方调用了 add_word）整个缓存失效。
+"""
+
+import re
+import zlib
+import heapq
+import random
+import hashlib
+import jieba
+from collections import Counter, defaultdict
+from utils import is_emoji
+
+
+def build_substring_pattern(words):
+    """把一组词编译成单个正则，用于快速判断文本是否包含其中任一词"""
+    if not words:
+        return None
+    # 长词优先，避免短词前缀抢先匹配
+    ordered = sorted(words, key=len, reverse=True)
+    return re.compile('|'.join(re.escape(w) for w in ordered))
+
+
+class SegmentationCache:
+    """
+    按文本下标缓存 jieba 分词结果
+    只保存每个词的结束偏移（小整数元组），取用时再切片，避免为每个词保存字符串
+    """
+
+    def __init__(self, texts):
+        self.texts = texts
+        self._offsets = [None] * len(texts)
+        self._dict_total = None  # 缓存对应的 jieba 词典总频次
+        self.hits = 0
+        self.misses = 0
+
+    def _check_dictionary(self):
+        """词典总频次变化后丢弃全部缓存，返回丢弃的条数"""
+        total = jieba.dt.total
+        if total == self._dict_total:
+            return 0
+        self._dict_total = total
+        invalidated = sum(1 for offsets in self._offsets if offsets is not None)
+        if invalidated:
+            self._offsets = [None] * len(self.texts)
+        return invalidated
+
+    def cut(self, idx):
+        """返回第 idx 条文本的分词结果（与 list(jieba.cut(text)) 相同）"""
+        self._check_dictionary()
+        text = self.texts[idx]
+        offsets = self._offsets[idx]
+        if offsets is None:
+            self.misses += 1
+            words = list(jieba.cut(text))
+            ends = []
+            pos = 0
+            for w in words:
+                pos += len(w)
+                ends.append(pos)
+            self._offsets[idx] = tuple(ends)
+            return words
+
+        self.hits += 1
+        words = []
+        start = 0
+        for end in offsets:
+            words.append(text[start:end])
+            start = end
+        return words
+
+    def cached_offsets(self, idx):
+        """返回第 idx 条文本缓存的词结束偏移，未缓存时返回 None"""
+        self._check_dictionary()
+        return self._offsets[idx]
+
+    def invalidate(self, new_words):
+        """
+        词典加入 new_words（且总频次保持不变）后调用，只丢弃包含这些词的文本的缓存，返回失效条数
+        """
+        if self._dict_total != jieba.dt.total:
+            return self._check_dictionary()
+        pattern = build_substring_pattern(new_words)
+        if pattern is None:
+            return 0
+
+        invalidated = 0
+        for idx, text in enumerate(self.texts):
+            if self._offsets[idx] is not None and pattern.search(text):
+                self._offsets[idx] = None
+                invalidated += 1
+        return invalidated
+
+
+def iter_count_tokens(words, emojis):
+    """把分词结果和 emoji 转换为参与词频统计的词（跳过空白、纯数字/符号）"""
+    words = [w for w in words if not is_emoji(w)]  # 从words中去掉emoji
+    for word in words + list(emojis):
+        word = word.strip()
+        if not word:
+            continue
+        if re.match(r'^[\d\W]+$', word) and not is_emoji(word):
+            continue
+        yield word
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    """splitmix64 终结函数：把 64 位整数打散为均匀分布的伪随机值"""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def sample_salt(seed=None):
+    """抽样用的 64 位盐值：指定 seed 时固定，否则每次随机"""
+    if seed is None:
+        return random.getrandbits(64)
+    digest = hashlib.sha256(str(seed).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+class ReservoirSampler:
+    """
+    按词的 bottom-k 抽样
+    每次出现（词, 消息下标）由盐值哈希得到一个伪随机键，每个词保留键最小的 k 个下标，
+    即在包含该词的消息上的均匀抽样。键只取决于 (盐值, 词, 下标)，与处理顺序无关，
+    因此各分片分别抽样后按键合并，结果与单进程逐条抽样完全相同。
+    同一条消息中重复出现的词只记录一次，样本中的消息下标互不重复
+    """
+
+    def __init__(self, k, salt):
+        self.k = k
+        self.salt = salt
+        self.entries = {}  # word -> 大顶堆 [(-key, idx), ...]
+        self._word_keys = {}
+
+    def add(self, word, idx):
+        """记录该词在第 idx 条消息中的一次出现"""
+        base = self._word_keys.get(word)
+        if base is None:
+            base = _mix64(self.salt ^ zlib.crc32(word.encode('utf-8')))
+            self._word_keys[word] = base
+        key = _mix64((base + idx) & _MASK64)
+
+        heap = self.entries.get(word)
+        if heap is None:
+            self.entries[word] = [(-key, idx)]
+        elif len(heap) < self.k:
+            if (-key, idx) not in heap:
+                heapq.heappush(heap, (-key, idx))
+        elif -heap[0][0] > key and (-key, idx) not in heap:
+            heapq.heapreplace(heap, (-key, idx))
+
+    @property
+    def samples(self):
+        """{word: [消息下标, ...]}"""
+        return {word: [idx for _, idx in heap] for word, heap in self.entries.items()}
+
+
+def merge_samples(a, b, k):
+    """合并两组 bottom-k 抽样结果（大顶堆条目列表），去掉重复的消息下标后保留键最小的 k 个"""
+    entries = list(set(a) | set(b))
+    if len(entries) <= k:
+        return entries
+    return heapq.nlargest(k, entries)
+
+
+def _init_worker(user_words, total):
+    """子进程初始化：加载词典，按主进程相同顺序加入新词/合并词"""
+    jieba.setLogLevel(jieba.logging.INFO)
+    jieba.initialize()
+    for word, freq in user_words:
+        jieba.add_word(word, freq=freq)
+    # fork 出的子进程已继承主进程词典，重复加词会让总频次翻倍，这里统一对齐
+    jieba.dt.total = total
+
+
+def _count_shard(shard, start, sample_limit, salt):
+    """
+    统计一个分片，返回 (word_freq, word_contributors, sample_entries)
+    start 为分片第一条文本的全局下标，样本记录全局下标
+    """
+    word_freq = Counter()
+    word_contributors = defaultdict(Counter)
+    sampler = ReservoirSampler(sample_limit, salt)
+
+    for idx, (text, uin, emojis, offsets) in enumerate(shard, start):
+        if offsets is None:
+            words = list(jieba.cut(text))
+        else:
+            words = []
+            pos = 0
+            for end in offsets:
+                words.append(text[pos:end])
+                pos = end
+
+        for word in iter_count_tokens(words, emojis):
+            word_freq[word] += 1
+            if uin:
+                word_contributors[word][uin] += 1
+            sampler.add(word, idx)
+
+    return word_freq, dict(word_contributors), sampler.entries
+
+
+def count_tokens_parallel(items, user_words, workers, sample_limit, seed=None):
+    """
+    多进程分词统计
+    user_words 为主进程通过 jieba.add_word 加入的 (word, freq)，按加入顺序排列；
+    items 为 (text, uin, emojis, cached_offsets) 列表，按顺序切成连续分片分发给进程池，
+    再按分片顺序合并，词频和贡献者与单进程逐条统计的结果完全一致；
+    样本为 items 下标，各分片分别做 bottom-k 抽样后按键合并，与单进程抽样结果相同
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    # 每个进程多分几片，平衡各分片耗时差异
+    shard_count = max(1, min(len(items), workers * 4))
+    shard_size = (len(items) + shard_count - 1) // shard_count
+    shards = [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+
+    word_freq = Counter()
+    word_contributors = defaultdict(Counter)
+    sample_entries = {}
+    salt = sample_salt(seed)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(user_words, jieba.dt.total)) as pool:
+        futures = [pool.submit(_count_shard, shard, shard_no * shard_size, sample_limit, salt)
+                   for shard_no, shard in enumerate(shards)]
+        for future in futures:
+            shard_freq, shard_contributors, shard_entries = future.result()
+            for word, entries in shard_entries.items():
+                sample_entries[word] = merge_samples(sample_entries.get(word, []), entries, sample_limit)
+            word_freq.update(shard_freq)
+            for word, contributors in shard_contributors.items():
+                word_contributors[word].update(contributors)
+
+    word_sample_ids = {word: [idx for _, idx in entries] for word, entries in sample_entries.items()}
+    return word_freq, word_contributors, word_sample_ids
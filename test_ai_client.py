@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI 客户端测试：在本地启动 OpenAI 兼容的桩服务，验证共享客户端、失败重试和结果缓存
+
+Usage:
+    python test_ai_client.py
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import config as cfg
+import ai_cache
+import ai_client
+import image_generator
+from image_generator import AICommentGenerator
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按 server.statuses 依次返回状态码，用完后一律返回 200 和固定锐评"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.client_ports.add(self.client_address[1])
+            status = server.statuses.pop(0) if server.statuses else 200
+
+        if status == 200:
+            payload = {
+                "id": "stub", "object": "chat.completion", "created": 0, "model": body['model'],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "群友的快乐源泉，天天都在用"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }
+        else:
+            payload = {"error": {"message": f"stub error {status}", "type": "stub"}}
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class AIClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.env = {key: os.environ.get(key) for key in ('OPENAI_API_KEY', 'OPENAI_BASE_URL', 'OPENAI_MODEL')}
+        os.environ['OPENAI_API_KEY'] = 'sk-test'
+        os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{cls.server.server_port}/v1"
+        os.environ['OPENAI_MODEL'] = 'stub-model'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        for key, value in cls.env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    def setUp(self):
+        self.server.requests = 0
+        self.server.statuses = []
+        self.server.client_ports = set()
+        self.backoff = image_generator.AI_RETRY_BACKOFF
+        image_generator.AI_RETRY_BACKOFF = 0
+        self.retries = getattr(cfg, 'AI_COMMENT_RETRIES', 2)
+        cfg.AI_COMMENT_RETRIES = 2
+        self.cache_dir = tempfile.mkdtemp()
+        ai_cache._cache = ai_cache.AICache(os.path.join(self.cache_dir, 'ai_cache.sqlite3'))
+        ai_client.close_clients()
+
+    def tearDown(self):
+        ai_client.close_clients()
+        ai_cache._cache = None
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        image_generator.AI_RETRY_BACKOFF = self.backoff
+        cfg.AI_COMMENT_RETRIES = self.retries
+
+    def test_client_is_shared_and_keeps_connection(self):
+        first, second = AICommentGenerator(), AICommentGenerator()
+        self.assertIs(first.client, second.client)
+        first._request_comment('哈哈', 10, ['哈哈哈'])
+        second._request_comment('好的', 8, ['好的收到'])
+        self.assertEqual(self.server.requests, 2)
+        # keep-alive：两次请求复用同一个 TCP 连接
+        self.assertEqual(len(self.server.client_ports), 1)
+
+    def test_retries_rate_limit_and_server_errors(self):
+        self.server.statuses = [429, 503]
+        comment = AICommentGenerator()._request_comment('哈哈', 10, ['哈哈哈'])
+        self.assertEqual(comment, '群友的快乐源泉，天天都在用')
+        self.assertEqual(self.server.requests, 3)
+
+    def test_does_not_retry_client_errors(self):
+        self.server.statuses = [400]
+        gen = AICommentGenerator()
+        comment = gen._request_comment('哈哈', 10, ['哈哈哈'])
+        self.assertEqual(self.server.requests, 1)
+        self.assertNotEqual(comment, '群友的快乐源泉，天天都在用')
+
+    def test_cache_hit_sends_no_request(self):
+        gen = AICommentGenerator()
+        first = gen.generate_comment('哈哈', 10, ['哈哈哈'])
+        self.assertEqual(self.server.requests, 1)
+        second = AICommentGenerator().generate_comment('哈哈', 10, ['哈哈哈'])
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
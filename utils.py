@@ -5,73 +5,243 @@ import math
 from datetime import datetime, timezone, timedelta
 from collections import Counter
 
+# ============================================
+# 文本清洗用的预编译正则与字符表（热点函数，每条消息都会调用）
+# ============================================
+
+# emoji 码点范围
+EMOJI_RANGES = [
+    (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
+    (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x1F900, 0x1F9FF),
+    (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2600, 0x26FF), (0x2300, 0x23FF),
+]
+EMOJI_CHARS = frozenset(chr(code) for start, end in EMOJI_RANGES for code in range(start, end + 1))
+EMOJI_PATTERN = re.compile(
+    '[' + ''.join(f'{chr(start)}-{chr(end)}' for start, end in EMOJI_RANGES) + ']'
+)
+
+# 单字统计：汉字与英文字母
+WORD_CHAR_CLASS = '\u4e00-\u9fffa-zA-Z'
+WORD_CHAR_PATTERN = re.compile(f'[{WORD_CHAR_CLASS}]')
+SINGLE_CHAR_PUNCTUATION = set('，。！？、；：""''（）,.!?;:\'"()[]【】《》<>…—～·')
+_BOUNDARY_CLASS = '\\s' + re.escape(''.join(sorted(SINGLE_CHAR_PUNCTUATION)))
+# 左右都是标点/空白（或文本边界）的单字
+BOUNDARY_CHAR_PATTERN = re.compile(
+    f'(?<![^{_BOUNDARY_CLASS}])([{WORD_CHAR_CLASS}])(?![^{_BOUNDARY_CLASS}])'
+)
+
+REPLY_PATTERN = re.compile(r'\[回复\s+[^\]]*\]')
+# 匹配 @ 开头，后面的所有内容直到遇到"空格+中文/字母"（实际消息内容的开始）
+AT_PATTERN = re.compile(r'@[^\n]*?(?=\s+[\u4e00-\u9fffa-zA-Z])')
+AT_TAIL_PATTERN = re.compile(r'@[^\n]*$')
+BRACKET_PATTERN = re.compile(r'[\[\]]')
+URL_PATTERN = re.compile(r'https?://\S+')
+WWW_PATTERN = re.compile(r'www\.\S+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+UTC8 = timezone(timedelta(hours=8))
+
+
 def load_json(filepath):
     with open(filepath, 'r', encoding='utf-8-sig') as f:
         return json.load(f)
 
+
+_json_decoder = json.JSONDecoder()
+
+
+class _JSONStreamReader:
+    """按块读取 JSON 文本，逐个解码对象/数组中的值，不整体载入文件"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+            return
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def peek(self):
+        """跳过空白，返回下一个字符（文件结束时返回空串）"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON格式错误: 期望 '{char}'")
+        self.pos += 1
+
+    def decode(self):
+        """解码当前位置的一个完整 JSON 值"""
+        self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buf, self.pos)
+                # 值恰好结束于缓冲区末尾时可能被截断（如数字），需要再读一块确认
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def iter_object_keys(self):
+        """逐个产出对象的键，调用方需在下一次迭代前消费对应的值"""
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.decode()
+            self.expect(':')
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"JSON格式错误: 对象中出现意外字符 '{char}'")
+
+    def iter_array(self):
+        """逐个产出数组元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.decode()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError(f"JSON格式错误: 数组中出现意外字符 '{char}'")
+
+
+class MessageStream:
+    """
+    可重复迭代的消息流
+    每次迭代重新打开文件，逐条解码 messages 数组，内存占用与文件大小无关。
+    metadata 为 load_json_stream 返回的字典：完整遍历一次后，
+    位于 messages 之后的顶层字段会补充进去（messages 只在遍历时解码一次）
+    """
+
+    def __init__(self, filepath, chunk_size=1 << 20, metadata=None):
+        self.filepath = filepath
+        self.chunk_size = chunk_size
+        self.metadata = metadata
+
+    def __iter__(self):
+        trailing = {}
+        with open(self.filepath, 'r', encoding='utf-8-sig') as f:
+            reader = _JSONStreamReader(f, self.chunk_size)
+            seen_messages = False
+            for key in reader.iter_object_keys():
+                if key == 'messages':
+                    yield from reader.iter_array()
+                    seen_messages = True
+                elif seen_messages:
+                    trailing[key] = reader.decode()
+                else:
+                    reader.decode()
+        if self.metadata is not None:
+            for key, value in trailing.items():
+                self.metadata.setdefault(key, value)
+
+
+def load_json_stream(filepath, chunk_size=1 << 20):
+    """
+    流式加载聊天记录：只解码 messages 之前的顶层元数据（chatName、chatInfo 等），
+    messages 替换为按需逐条读取的 MessageStream；读到 messages 即停止，不为跳过它而解码全部消息，
+    messages 之后的顶层字段在第一次遍历消息后补充到返回的字典中
+    """
+    data = {}
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        reader = _JSONStreamReader(f, chunk_size)
+        for key in reader.iter_object_keys():
+            if key == 'messages':
+                break
+            data[key] = reader.decode()
+    data['messages'] = MessageStream(filepath, chunk_size, data)
+    return data
+
 def extract_emojis(text):
-    emoji_pattern = re.compile(
-        "["
-        "\U0001F600-\U0001F64F"
-        "\U0001F300-\U0001F5FF"
-        "\U0001F680-\U0001F6FF"
-        "\U0001F1E0-\U0001F1FF"
-        "\U00002702-\U000027B0"
-        "\U0001F900-\U0001F9FF"
-        "\U0001FA00-\U0001FA6F"
-        "\U0001FA70-\U0001FAFF"
-        "\U00002600-\U000026FF"
-        "\U00002300-\U000023FF"
-        "]",
-        flags=re.UNICODE
-    )
-    return emoji_pattern.findall(text)
+    return EMOJI_PATTERN.findall(text)
 
 def is_emoji(char):
-    if len(char) != 1:
-        return False
-    code = ord(char)
-    emoji_ranges = [
-        (0x1F600, 0x1F64F), (0x1F300, 0x1F5FF), (0x1F680, 0x1F6FF),
-        (0x1F1E0, 0x1F1FF), (0x2702, 0x27B0), (0x1F900, 0x1F9FF),
-        (0x1FA00, 0x1FA6F), (0x1FA70, 0x1FAFF), (0x2600, 0x26FF), (0x2300, 0x23FF),
-    ]
-    return any(start <= code <= end for start, end in emoji_ranges)
+    return char in EMOJI_CHARS
 
 def parse_timestamp(ts):
     try:
         dt = datetime.fromisoformat(ts.replace('Z', '+00:00'))
-        local_dt = dt.astimezone(timezone(timedelta(hours=8)))
+        local_dt = dt.astimezone(UTC8)
         return local_dt.hour
     except:
         return None
 
+def strip_brackets(text):
+    """
+    单遍去除所有成对方括号及其内容（含嵌套），不成对的括号保留
+    等价于反复执行 re.sub(r'\[[^\[\]]*\]', '', text) 直到不再变化
+    """
+    if '[' not in text:
+        return text
+    
+    pieces = []
+    open_marks = []  # 每个未闭合 '[' 对应的 pieces 长度
+    last = 0
+    for match in BRACKET_PATTERN.finditer(text):
+        pos = match.start()
+        pieces.append(text[last:pos])
+        last = pos + 1
+        if text[pos] == '[':
+            open_marks.append(len(pieces))
+            pieces.append('[')
+        elif open_marks:
+            del pieces[open_marks.pop():]
+        else:
+            pieces.append(']')
+    pieces.append(text[last:])
+    return ''.join(pieces)
+
 def clean_text(text):
     """清理文本，去除表情、@、回复等干扰内容"""
     if not text:
         return ""
     
     # 1. 去除回复标记 [回复 xxx: yyy]
-    text = re.sub(r'\[回复\s+[^\]]*\]', '', text)
+    if '[回复' in text:
+        text = REPLY_PATTERN.sub('', text)
     
     # 2. 去除@某人（包括群昵称中的空格、括号等）
-    # 匹配 @ 开头，后面的所有内容直到遇到"空格+中文/字母"（实际消息内容的开始）
-    text = re.sub(r'@[^\n]*?(?=\s+[\u4e00-\u9fffa-zA-Z])', '', text)
-    # 处理只有@没有后续内容的情况
-    text = re.sub(r'@[^\n]*$', '', text)
+    if '@' in text:
+        text = AT_PATTERN.sub('', text)
+        # 处理只有@没有后续内容的情况
+        text = AT_TAIL_PATTERN.sub('', text)
     
-    # 3. 循环去除所有方括号内容（如[图片][表情]等）
-    prev = None
-    while prev != text:
-        prev = text
-        text = re.sub(r'\[[^\[\]]*\]', '', text)
+    # 3. 去除所有方括号内容（如[图片][表情]等）
+    text = strip_brackets(text)
     
     # 4. 去除链接
-    text = re.sub(r'https?://\S+', '', text)
-    text = re.sub(r'www\.\S+', '', text)
+    if '://' in text:
+        text = URL_PATTERN.sub('', text)
+    if 'www.' in text:
+        text = WWW_PATTERN.sub('', text)
     
     # 5. 去除多余空白
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
     
     return text
 
@@ -127,27 +297,19 @@ def analyze_single_chars(texts):
     total_count = Counter()
     solo_count = Counter()
     boundary_count = Counter()
-    punctuation = set('，。！？、；：""''（）,.!?;:\'"()[]【】《》<>…—～·')
     
     for text in texts:
         # 统计每个字的总出现次数
-        for char in text:
-            if re.match(r'^[\u4e00-\u9fffa-zA-Z]$', char):
-                total_count[char] += 1
+        chars = WORD_CHAR_PATTERN.findall(text)
+        total_count.update(chars)
         
         # 统计单字消息
-        clean_chars = [c for c in text if re.match(r'^[\u4e00-\u9fffa-zA-Z]$', c)]
-        if len(clean_chars) == 1:
-            solo_count[clean_chars[0]] += 1
+        if len(chars) == 1:
+            solo_count[chars[0]] += 1
         
         # 统计在边界位置的出现
-        for i, char in enumerate(text):
-            if not re.match(r'^[\u4e00-\u9fffa-zA-Z]$', char):
-                continue
-            left_ok = (i == 0) or (text[i-1] in punctuation) or (text[i-1].isspace())
-            right_ok = (i == len(text)-1) or (text[i+1] in punctuation) or (text[i+1].isspace())
-            if left_ok and right_ok:
-                boundary_count[char] += 1
+        if chars:
+            boundary_count.update(BOUNDARY_CHAR_PATTERN.findall(text))
     
     result = {}
     for char in total_count:
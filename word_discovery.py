@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+新词发现：统计 2-5 字 n-gram 的频次、左右邻接熵和内部凝聚度（PMI）
+
+提供三种实现，结果相同：
+- python:       逐个 n-gram 用字典计数，无额外依赖
+- numpy:        把字符编码为整数数组，用排序/去重批量计数，内存和速度都更适合大群
+- suffix_array: 基于后缀数组和 LCP 枚举高频子串，内存与语料长度线性相关，适合多年合并的超大语料
+"""
+
+import re
+import math
+from collections import Counter, defaultdict
+
+from utils import calculate_entropy
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖
+    np = None
+
+
+SENTENCE_SPLIT_PATTERN = re.compile(r'[，。！？、；：""''（）\s\n\r,\.!?\(\)]')
+MAX_NGRAM_LEN = 5
+
+
+def split_sentences(texts):
+    """按标点分句，返回长度不少于 2 的句子"""
+    sentences = []
+    for text in texts:
+        for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+            sentence = sentence.strip()
+            if len(sentence) >= 2:
+                sentences.append(sentence)
+    return sentences
+
+
+def _is_skipped_ngram(ngram):
+    """跳过纯数字/符号/纯英文"""
+    return bool(re.match(r'^[\d\s\W]+$', ngram) or re.match(r'^[a-zA-Z]+$', ngram))
+
+
+def discover_python(texts, min_freq, entropy_threshold, pmi_threshold):
+    """字典计数实现"""
+    ngram_freq = Counter()
+    left_neighbors = defaultdict(Counter)
+    right_neighbors = defaultdict(Counter)
+    total_chars = 0
+
+    for sentence in split_sentences(texts):
+        total_chars += len(sentence)
+
+        for n in range(2, min(MAX_NGRAM_LEN + 1, len(sentence) + 1)):
+            for i in range(len(sentence) - n + 1):
+                ngram = sentence[i:i+n]
+                if _is_skipped_ngram(ngram):
+                    continue
+                ngram_freq[ngram] += 1
+                if i > 0:
+                    left_neighbors[ngram][sentence[i-1]] += 1
+                else:
+                    left_neighbors[ngram]['<BOS>'] += 1
+                if i + n < len(sentence):
+                    right_neighbors[ngram][sentence[i+n]] += 1
+                else:
+                    right_neighbors[ngram]['<EOS>'] += 1
+
+    discovered = set()
+    for word, freq in ngram_freq.items():
+        if freq < min_freq:
+            continue
+
+        # 邻接熵
+        left_ent = calculate_entropy(left_neighbors[word])
+        right_ent = calculate_entropy(right_neighbors[word])
+        if min(left_ent, right_ent) < entropy_threshold:
+            continue
+
+        # PMI（内部凝聚度）
+        min_pmi = float('inf')
+        for i in range(1, len(word)):
+            left_freq = ngram_freq.get(word[:i], 0)
+            right_freq = ngram_freq.get(word[i:], 0)
+            if left_freq > 0 and right_freq > 0:
+                pmi = math.log2((freq * total_chars) / (left_freq * right_freq + 1e-10))
+                min_pmi = min(min_pmi, pmi)
+
+        if min_pmi == float('inf'):
+            min_pmi = 0
+
+        if min_pmi < pmi_threshold:
+            continue
+
+        discovered.add(word)
+
+    return discovered
+
+
+def _encode_corpus(sentences):
+    """
+    把句子拼接为码点数组
+    返回 (corpus, codes, remaining, is_start)：remaining[i] 为位置 i 到句尾的字符数
+    """
+    corpus = ''.join(sentences)
+    codes = np.frombuffer(corpus.encode('utf-32-le', 'surrogatepass'), dtype='<u4').astype(np.int64)
+
+    lengths = np.fromiter((len(s) for s in sentences), dtype=np.int64, count=len(sentences))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    sentence_end = np.repeat(ends, lengths)
+    remaining = sentence_end - np.arange(len(codes), dtype=np.int64)
+    is_start = np.zeros(len(codes), dtype=bool)
+    is_start[starts] = True
+    return corpus, codes, remaining, is_start
+
+
+def _char_class_flags(unique_codes):
+    """逐个不同字符计算过滤规则所需的字符类别（每个字符只判断一次）"""
+    symbol_like = np.empty(len(unique_codes), dtype=bool)
+    ascii_alpha = np.empty(len(unique_codes), dtype=bool)
+    for i, code in enumerate(unique_codes.tolist()):
+        char = chr(code)
+        symbol_like[i] = re.match(r'^[\d\s\W]$', char) is not None
+        ascii_alpha[i] = re.match(r'^[a-zA-Z]$', char) is not None
+    return symbol_like, ascii_alpha
+
+
+def _window_all(flags, n):
+    """flags[i:i+n] 是否全部为 True（越界部分视为 False）"""
+    csum = np.concatenate(([0], np.cumsum(flags, dtype=np.int64)))
+    out = np.zeros(len(flags), dtype=bool)
+    if len(flags) >= n:
+        out[:len(flags) - n + 1] = (csum[n:] - csum[:-n]) == n
+    return out
+
+
+def _neighbor_entropy(gids, neighbors, freq):
+    """按 n-gram 分组计算邻接熵"""
+    vocab = int(neighbors.max()) + 1 if len(neighbors) else 1
+    pair_keys, pair_counts = np.unique(gids * vocab + neighbors, return_counts=True)
+    return _grouped_entropy(pair_keys // vocab, pair_counts, freq)
+
+
+def _grouped_entropy(pair_gids, pair_counts, freq):
+    """由每个 (n-gram, 邻接字) 的计数求邻接熵：H = log2(T) - Σ c·log2(c) / T"""
+    counts = pair_counts.astype(np.float64)
+    weighted = np.bincount(pair_gids, weights=counts * np.log2(counts), minlength=len(freq))
+    total = freq.astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropy = np.log2(total) - weighted / total
+    # 只有一种邻接字时熵应为 0，消除浮点误差带来的微小负数
+    return np.where(total > 0, np.maximum(entropy, 0.0), 0.0)
+
+
+def _min_pmi(cand_freq, total_chars, part_freqs):
+    """
+    PMI：对每个切分点的 (左半频次, 右半频次) 计算互信息取最小值，
+    没有有效切分（任一半频次为 0）时视为 0
+    """
+    cand_freq = cand_freq.astype(np.float64)
+    min_pmi = np.full(len(cand_freq), np.inf)
+    for left_freq, right_freq in part_freqs:
+        valid = (left_freq > 0) & (right_freq > 0)
+        with np.errstate(divide='ignore'):
+            pmi = np.log2((cand_freq * total_chars) / (left_freq * right_freq + 1e-10))
+        min_pmi = np.where(valid, np.minimum(min_pmi, pmi), min_pmi)
+    min_pmi[np.isinf(min_pmi)] = 0
+    return min_pmi
+
+
+def discover_numpy(texts, min_freq, entropy_threshold, pmi_threshold):
+    """整数数组批量计数实现"""
+    sentences = split_sentences(texts)
+    if not sentences:
+        return set()
+
+    corpus, codes, remaining, is_start = _encode_corpus(sentences)
+    total_chars = len(codes)
+
+    unique_codes, char_ids = np.unique(codes, return_inverse=True)
+    char_ids = char_ids.astype(np.int64)
+    symbol_like, ascii_alpha = _char_class_flags(unique_codes)
+    pos_symbol = symbol_like[char_ids]
+    pos_alpha = ascii_alpha[char_ids]
+
+    n_chars = len(unique_codes)
+    bos = n_chars
+    eos = n_chars + 1
+    left_chars = np.where(is_start, bos, np.concatenate(([bos], char_ids[:-1])))
+
+    # gram_ids[n][i]: 位置 i 起长度为 n 的 n-gram 的稠密编号（-1 表示越过句尾）
+    # freqs[n][g]:    编号 g 的 n-gram 频次（被过滤规则跳过的 n-gram 记为 0）
+    gram_ids = {1: char_ids}
+    freqs = {1: np.zeros(n_chars, dtype=np.int64)}
+    positions = {}
+
+    for n in range(2, MAX_NGRAM_LEN + 1):
+        in_range = remaining >= n
+        pos = np.nonzero(in_range)[0]
+        ids = np.full(total_chars, -1, dtype=np.int64)
+        if len(pos) == 0:
+            gram_ids[n] = ids
+            freqs[n] = np.zeros(0, dtype=np.int64)
+            positions[n] = pos
+            continue
+
+        keys = gram_ids[n - 1][pos] * n_chars + char_ids[pos + n - 1]
+        _, dense = np.unique(keys, return_inverse=True)
+        ids[pos] = dense
+        gram_ids[n] = ids
+
+        skipped = _window_all(pos_symbol, n) | _window_all(pos_alpha, n)
+        counted = pos[~skipped[pos]]
+        freqs[n] = np.bincount(ids[counted], minlength=int(dense.max()) + 1)
+        positions[n] = counted
+
+    discovered = set()
+    for n in range(2, MAX_NGRAM_LEN + 1):
+        pos = positions[n]
+        if len(pos) == 0:
+            continue
+        ids = gram_ids[n][pos]
+        freq = freqs[n]
+
+        # 只为满足频次阈值的 n-gram 计算邻接熵
+        keep = freq[ids] >= min_freq
+        pos, ids = pos[keep], ids[keep]
+        if len(pos) == 0:
+            continue
+
+        right_chars = np.where(remaining[pos] > n, char_ids[np.minimum(pos + n, total_chars - 1)], eos)
+        left_ent = _neighbor_entropy(ids, left_chars[pos], freq)
+        right_ent = _neighbor_entropy(ids, right_chars, freq)
+
+        cand_ids, first = np.unique(ids, return_index=True)
+        cand_pos = pos[first]
+        min_ent = np.minimum(left_ent[cand_ids], right_ent[cand_ids])
+        ent_ok = min_ent >= entropy_threshold
+        cand_ids, cand_pos = cand_ids[ent_ok], cand_pos[ent_ok]
+        if len(cand_ids) == 0:
+            continue
+
+        part_freqs = [
+            (freqs[k][gram_ids[k][cand_pos]], freqs[n - k][gram_ids[n - k][cand_pos + k]])
+            for k in range(1, n)
+        ]
+        min_pmi = _min_pmi(freq[cand_ids], total_chars, part_freqs)
+
+        for p in cand_pos[min_pmi >= pmi_threshold].tolist():
+            discovered.add(corpus[p:p + n])
+
+    return discovered
+
+
+def _dense_rank(keys):
+    """把整数键映射为从 1 开始的稠密名次（0 留给句尾哨兵）"""
+    _, inverse = np.unique(keys, return_inverse=True)
+    return inverse.astype(np.int64) + 1
+
+
+def _shift_rank(ranks, remaining, offset):
+    """位置 p 处取 ranks[p + offset]，越过句尾时为哨兵 0"""
+    shifted = np.zeros(len(ranks), dtype=np.int64)
+    idx = np.nonzero(remaining > offset)[0]
+    shifted[idx] = ranks[idx + offset]
+    return shifted
+
+
+def _pair_rank(left, right):
+    return _dense_rank(left * (int(right.max()) + 1) + right)
+
+
+def _build_suffix_array(char_ids, remaining, depth):
+    """
+    按前 depth 个字符排序的后缀数组及相邻后缀的 LCP（最多 depth）
+    句尾之后视为比任何字符都小的哨兵，因此后缀不会跨句比较
+    """
+    # 倍增法求前 1/2/4/depth 个字符的名次
+    rank1 = np.where(remaining > 0, char_ids + 1, 0)
+    ranks = {1: rank1}
+    length = 1
+    while length < depth:
+        step = min(length, depth - length)
+        ranks[length + step] = _pair_rank(ranks[length], _shift_rank(ranks[step], remaining, length))
+        length += step
+    sa = np.argsort(ranks[depth], kind='stable').astype(np.int32)
+    del ranks
+
+    # LCP：逐字比较相邻后缀，直到不同或遇到句尾
+    lcp = np.zeros(len(sa), dtype=np.int8)
+    prev, cur = sa[:-1].astype(np.int64), sa[1:].astype(np.int64)
+    matching = np.ones(len(cur), dtype=bool)
+    for j in range(depth):
+        ok = (remaining[prev] > j) & (remaining[cur] > j)
+        same = np.zeros(len(cur), dtype=bool)
+        same[ok] = char_ids[prev[ok] + j] == char_ids[cur[ok] + j]
+        matching &= same
+        lcp[1:] += matching
+    return sa, lcp
+
+
+def discover_suffix_array(texts, min_freq, entropy_threshold, pmi_threshold):
+    """
+    后缀数组实现
+    同一 n-gram 的所有出现在后缀数组中是一段连续区间（相邻 LCP >= n），
+    区间长度即频次；右邻接字在区间内已有序，子串频次通过名次数组定位，
+    不需要为每个 n-gram 建立字典，内存与语料长度呈线性关系
+    """
+    sentences = split_sentences(texts)
+    if not sentences:
+        return set()
+
+    corpus, codes, remaining, is_start = _encode_corpus(sentences)
+    total_chars = len(codes)
+
+    unique_codes, char_ids = np.unique(codes, return_inverse=True)
+    del codes
+    char_ids = char_ids.astype(np.int64)
+    symbol_like, ascii_alpha = _char_class_flags(unique_codes)
+    pos_symbol = symbol_like[char_ids]
+    pos_alpha = ascii_alpha[char_ids]
+    n_chars = len(unique_codes)
+
+    sa, lcp = _build_suffix_array(char_ids, remaining, MAX_NGRAM_LEN)
+    sa64 = sa.astype(np.int64)
+    inverse_sa = np.empty(total_chars, dtype=np.int32)
+    inverse_sa[sa] = np.arange(total_chars, dtype=np.int32)
+    rem_sorted = remaining[sa64]
+
+    # 按名次顺序：gids[n][r] 为第 r 个后缀前 n 字所属区间编号，freqs[n][g] 为区间频次
+    gids = {}
+    freqs = {1: np.zeros(1, dtype=np.int64)}
+    counted = {}
+    for n in range(2, MAX_NGRAM_LEN + 1):
+        boundary = lcp < n
+        boundary[0] = True
+        gid = (np.cumsum(boundary) - 1).astype(np.int32)
+        skipped = _window_all(pos_symbol, n) | _window_all(pos_alpha, n)
+        ok = (rem_sorted >= n) & ~skipped[sa64]
+        gids[n] = gid
+        counted[n] = ok
+        freqs[n] = np.bincount(gid[ok], minlength=int(gid[-1]) + 1)
+
+    def part_freq(k, ranks):
+        if k < 2:
+            return np.zeros(len(ranks), dtype=np.int64)
+        return freqs[k][gids[k][ranks]]
+
+    left_chars = np.where(is_start, n_chars + 1, np.concatenate(([0], char_ids[:-1] + 1)))
+    discovered = set()
+    for n in range(2, MAX_NGRAM_LEN + 1):
+        gid, freq = gids[n], freqs[n]
+        ranks = np.nonzero(counted[n] & (freq[gid] >= min_freq))[0]
+        if len(ranks) == 0:
+            continue
+        rank_gids = gid[ranks]
+        positions = sa64[ranks]
+
+        # 右邻接：区间内后缀按第 n+1 字有序（n < 最大长度时），直接统计连续段
+        right = np.where(rem_sorted[ranks] > n,
+                         char_ids[np.minimum(positions + n, total_chars - 1)] + 1, 0)
+        if n < MAX_NGRAM_LEN:
+            change = np.ones(len(ranks), dtype=bool)
+            change[1:] = (rank_gids[1:] != rank_gids[:-1]) | (right[1:] != right[:-1])
+            starts = np.nonzero(change)[0]
+            run_counts = np.diff(np.append(starts, len(ranks)))
+            right_ent = _grouped_entropy(rank_gids[starts], run_counts, freq)
+        else:
+            right_ent = _neighbor_entropy(rank_gids.astype(np.int64), right, freq)
+        left_ent = _neighbor_entropy(rank_gids.astype(np.int64), left_chars[positions], freq)
+
+        first = np.ones(len(ranks), dtype=bool)
+        first[1:] = rank_gids[1:] != rank_gids[:-1]
+        cand_ranks = ranks[first]
+        cand_gids = rank_gids[first]
+        ent_ok = np.minimum(left_ent[cand_gids], right_ent[cand_gids]) >= entropy_threshold
+        cand_ranks, cand_gids = cand_ranks[ent_ok], cand_gids[ent_ok]
+        if len(cand_ranks) == 0:
+            continue
+
+        cand_pos = sa64[cand_ranks]
+        part_freqs = [
+            (part_freq(k, cand_ranks), part_freq(n - k, inverse_sa[cand_pos + k]))
+            for k in range(1, n)
+        ]
+        min_pmi = _min_pmi(freq[cand_gids], total_chars, part_freqs)
+
+        for p in cand_pos[min_pmi >= pmi_threshold].tolist():
+            discovered.add(corpus[p:p + n])
+
+    return discovered
+
+
+def discover_new_words(texts, min_freq, entropy_threshold, pmi_threshold, backend='auto'):
+    """
+    新词发现入口
+    backend: 'auto'（有 numpy 时用 numpy）、'numpy'、'suffix_array' 或 'python'
+    """
+    if backend == 'auto':
+        backend = 'numpy' if np is not None else 'python'
+
+    if backend in ('numpy', 'suffix_array'):
+        if np is None:
+            print("   ⚠️ 未安装 numpy，新词发现改用 python 实现")
+        elif backend == 'suffix_array':
+            return discover_suffix_array(texts, min_freq, entropy_threshold, pmi_threshold)
+        else:
+            return discover_numpy(texts, min_freq, entropy_threshold, pmi_threshold)
+
+    return discover_python(texts, min_freq, entropy_threshold, pmi_threshold)
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+热词过滤流水线
+
+由 config 构建一次，按固定顺序对每个词应用过滤规则，
+并记录每条规则过滤掉的词数，便于解释过滤结果。
+"""
+
+import re
+import string
+from collections import Counter
+
+from utils import is_emoji
+
+
+# 字符类别位
+CHAR_DIGIT_SPACE = 1   # 数字或空白
+CHAR_PUNCTUATION = 2   # 标点
+CHAR_ALL = CHAR_DIGIT_SPACE | CHAR_PUNCTUATION
+
+PUNCTUATION_CHARS = frozenset(string.punctuation + '，。！？；：、""''（）【】')
+
+# 规则名称（按判断顺序）及说明
+FILTER_RULES = [
+    ('length', '长度'),
+    ('min_freq', '低频'),
+    ('blacklist', '黑名单'),
+    ('stopword', '停用词'),
+    ('single_char', '单字'),
+    ('numeric', '纯数字'),
+    ('punctuation', '纯标点'),
+]
+
+
+class WordFilter:
+    """热词过滤器"""
+
+    def __init__(self, config, single_char_stats):
+        """
+        Args:
+            config: 配置模块（读取长度/频次阈值、白名单、黑名单、停用词、单字阈值）
+            single_char_stats: analyze_single_chars 的结果
+        """
+        self.min_len = config.MIN_WORD_LEN
+        self.max_len = config.MAX_WORD_LEN
+        self.min_freq = config.MIN_FREQ
+        self.whitelist = frozenset(config.WHITELIST)
+        self.blacklist = frozenset(config.BLACKLIST)
+        self.stopwords = frozenset(config.STOPWORDS)
+        self.single_min_ratio = config.SINGLE_MIN_SOLO_RATIO
+        self.single_min_count = config.SINGLE_MIN_SOLO_COUNT
+        self.single_char_stats = single_char_stats
+
+        self._char_masks = {}
+        self.rejections = Counter()
+        self.whitelisted = 0
+
+    def _char_mask(self, char):
+        """字符类别位掩码（按字符缓存）"""
+        mask = self._char_masks.get(char)
+        if mask is None:
+            mask = 0
+            if re.match(r'[\d\s]', char):
+                mask |= CHAR_DIGIT_SPACE
+            if char in PUNCTUATION_CHARS:
+                mask |= CHAR_PUNCTUATION
+            self._char_masks[char] = mask
+        return mask
+
+    def _word_mask(self, word):
+        """所有字符共有的类别位"""
+        mask = CHAR_ALL
+        for char in word:
+            mask &= self._char_mask(char)
+            if not mask:
+                break
+        return mask
+
+    def check(self, word, freq):
+        """返回过滤该词的规则名，保留时返回 None"""
+        # 长度过滤
+        length = len(word)
+        if length < self.min_len or length > self.max_len:
+            return 'length'
+        if freq < self.min_freq:
+            return 'min_freq'
+
+        # 白名单直接通过
+        if word in self.whitelist:
+            return None
+
+        # 黑名单跳过
+        if word in self.blacklist:
+            return 'blacklist'
+
+        # 停用词（emoji除外）
+        if word in self.stopwords and not is_emoji(word):
+            return 'stopword'
+
+        # 单字特殊处理（emoji保留）
+        if length == 1 and not is_emoji(word):
+            stats = self.single_char_stats.get(word)
+            if not stats:
+                return 'single_char'
+            total, indep, ratio = stats
+            if ratio < self.single_min_ratio or indep < self.single_min_count:
+                return 'single_char'
+
+        mask = self._word_mask(word)
+        # 纯数字跳过
+        if word and mask & CHAR_DIGIT_SPACE:
+            return 'numeric'
+        # 纯标点跳过
+        if not word or mask & CHAR_PUNCTUATION:
+            return 'punctuation'
+
+        return None
+
+    def apply(self, word_freq):
+        """过滤词频表，返回保留下来的 Counter（保持原有顺序）"""
+        filtered = Counter()
+        for word, freq in word_freq.items():
+            rule = self.check(word, freq)
+            if rule is None:
+                if word in self.whitelist:
+                    self.whitelisted += 1
+                filtered[word] = freq
+            else:
+                self.rejections[rule] += 1
+        return filtered
+
+    def summary(self):
+        """各规则过滤数量的说明文本"""
+        parts = [f"{label} {self.rejections[rule]}" for rule, label in FILTER_RULES
+                 if self.rejections[rule]]
+        if self.whitelisted:
+            parts.append(f"白名单保留 {self.whitelisted}")
+        return ', '.join(parts) if parts else '无'